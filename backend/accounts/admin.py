@@ -26,7 +26,7 @@ class DepartmentAdmin(admin.ModelAdmin):
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name', 'department', 'teacher', 'credits')
+    list_display = ('code', 'name', 'department', 'teacher', 'credits', 'sessions_per_week')
     list_filter = ('department', 'teacher')
     search_fields = ('code', 'name')
     filter_horizontal = ('students',)
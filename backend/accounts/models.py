@@ -70,6 +70,7 @@ class Course(models.Model):
     code = models.CharField(max_length=20, unique=True)
     department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='courses')
     credits = models.IntegerField(default=3)
+    sessions_per_week = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Weekly timetable sessions; defaults to the number of credits")
     description = models.TextField(blank=True)
     teacher = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='taught_courses', limit_choices_to={'role': 'teacher'})
     students = models.ManyToManyField(User, related_name='enrolled_courses', blank=True, limit_choices_to={'role': 'student'})
@@ -85,6 +86,15 @@ class Course(models.Model):
     
     def __str__(self):
         return f"{self.code} - {self.name}"
+    
+    @property
+    def weekly_sessions(self):
+        return self.count_weekly_sessions(self.sessions_per_week, self.credits)
+    
+    @staticmethod
+    def count_weekly_sessions(sessions_per_week, credits):
+        """Weekly timetable sessions: ``sessions_per_week``, else one per credit."""
+        return sessions_per_week or max(1, credits)
 
 
 class StudentProfile(models.Model):
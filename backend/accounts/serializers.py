@@ -77,9 +77,19 @@ class CourseSerializer(serializers.ModelSerializer):
         return f"{obj.teacher.first_name} {obj.teacher.last_name}" if obj.teacher else None
     
     def get_student_count(self, obj):
+        if hasattr(obj, 'student_total'):  # annotated by the view's queryset
+            return obj.student_total
         return obj.students.count()
 
 
+class CourseSummarySerializer(CourseSerializer):
+    """Course serializer without the enrolled student ids, for nesting in lists."""
+    
+    class Meta(CourseSerializer.Meta):
+        fields = None
+        exclude = ('students',)
+
+
 class StudentProfileSerializer(serializers.ModelSerializer):
     """Student profile serializer."""
     user = UserSerializer(read_only=True)
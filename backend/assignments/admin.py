@@ -2,7 +2,7 @@
 Admin for assignments app.
 """
 from django.contrib import admin
-from .models import Assignment, Submission, DeadlineNotification
+from .models import Assignment, Submission, DeadlineNotification, UploadSession
 
 
 @admin.register(Assignment)
@@ -26,3 +26,10 @@ class DeadlineNotificationAdmin(admin.ModelAdmin):
     list_display = ('assignment', 'student', 'reminder_type', 'reminder_sent_at')
     list_filter = ('reminder_type', 'reminder_sent_at')
 
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'assignment', 'target', 'offset', 'size', 'status', 'updated_at')
+    list_filter = ('status', 'target')
+    search_fields = ('filename', 'user__email')
+    readonly_fields = ('created_at', 'updated_at')
@@ -1,11 +1,34 @@
 """
 Assignment and submission models.
 """
+import uuid
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from accounts.models import User, Course
 
 
+class AssignmentQuerySet(models.QuerySet):
+    """Queries over assignments."""
+    
+    def with_counts(self):
+        """
+        Assignments with their teacher, course and the counts the serializers
+        show, so a page of them takes a fixed number of queries.
+        
+        Submission counts are a correlated subquery rather than a join, which
+        would multiply rows when the queryset also filters on enrollment.
+        """
+        submissions = Submission.objects.filter(assignment=OuterRef('pk')).order_by().values(
+            'assignment'
+        ).annotate(total=Count('id')).values('total')
+        courses = Course.objects.select_related('department', 'teacher').annotate(student_total=Count('students'))
+        return self.select_related('teacher').prefetch_related(Prefetch('course', queryset=courses)).annotate(
+            submission_total=Coalesce(Subquery(submissions, output_field=IntegerField()), 0)
+        )
+
+
 class Assignment(models.Model):
     """Assignment model."""
     title = models.CharField(max_length=200)
@@ -18,6 +41,8 @@ class Assignment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AssignmentQuerySet.as_manager()
+    
     class Meta:
         db_table = 'assignments'
         indexes = [
@@ -36,6 +61,8 @@ class Assignment(models.Model):
     
     @property
     def submission_count(self):
+        if hasattr(self, 'submission_total'):  # annotated by with_counts()
+            return self.submission_total
         return self.submissions.count()
 
 
@@ -87,3 +114,43 @@ class DeadlineNotification(models.Model):
             models.Index(fields=['assignment', 'student']),
         ]
 
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of an assignment or submission file.
+    
+    Chunks are appended to a part file under ``CHUNKED_UPLOAD_DIR`` and
+    ``offset`` records how many bytes are safely on disk, so an interrupted
+    client can ask for it and continue from there (see ``uploads``).
+    """
+    TARGET_CHOICES = [
+        ('submission', 'Submission'),
+        ('assignment', 'Assignment'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES, default='submission')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Total size of the file in bytes")
+    checksum = models.CharField(max_length=64, help_text="SHA-256 of the whole file, hex encoded")
+    offset = models.BigIntegerField(default=0, help_text="Bytes received so far")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'upload_sessions'
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size}) - {self.user.email}"
@@ -1,14 +1,18 @@
 """
 Serializers for assignments app.
 """
+import os
+import re
+from django.conf import settings
 from rest_framework import serializers
-from .models import Assignment, Submission, DeadlineNotification
-from accounts.serializers import CourseSerializer, UserSerializer
+from .models import Assignment, Submission, DeadlineNotification, UploadSession
+from accounts.models import User
+from accounts.serializers import CourseSummarySerializer, UserSerializer
 
 
 class AssignmentSerializer(serializers.ModelSerializer):
     """Assignment serializer."""
-    course = CourseSerializer(read_only=True)
+    course = CourseSummarySerializer(read_only=True)
     course_id = serializers.IntegerField(write_only=True)
     teacher_name = serializers.SerializerMethodField()
     submission_count = serializers.SerializerMethodField()
@@ -45,6 +49,105 @@ class SubmissionSerializer(serializers.ModelSerializer):
         return obj.is_late
 
 
+class AssignmentSummarySerializer(serializers.ModelSerializer):
+    """Assignment fields side-loaded with compact submission lists."""
+    submission_count = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Assignment
+        fields = ('id', 'title', 'course', 'teacher', 'deadline', 'max_marks', 'submission_count')
+    
+    def get_submission_count(self, obj):
+        return obj.submission_count
+
+
+class StudentSummarySerializer(serializers.ModelSerializer):
+    """Student fields side-loaded with compact submission lists."""
+    class Meta:
+        model = User
+        fields = ('id', 'email', 'first_name', 'last_name')
+
+
+class SubmissionRowSerializer(serializers.ModelSerializer):
+    """
+    Submission with its assignment and student as ids, for compact lists;
+    the referenced objects are side-loaded once per page by ``side_load``.
+    """
+    is_late = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Submission
+        fields = (
+            'id', 'assignment', 'student', 'file_attachment', 'submitted_at', 'updated_at',
+            'marks_obtained', 'is_graded', 'is_late'
+        )
+    
+    def get_is_late(self, obj):
+        return obj.is_late
+
+
+def side_load(submissions, context=None):
+    """
+    The assignments, courses and students referenced by ``submissions``,
+    each serialized once and keyed by id.
+    """
+    assignments = Assignment.objects.with_counts().filter(
+        id__in={submission.assignment_id for submission in submissions}
+    )
+    students = User.objects.filter(id__in={submission.student_id for submission in submissions})
+    courses = {assignment.course_id: assignment.course for assignment in assignments}
+    return {
+        'assignments': {
+            assignment.id: AssignmentSummarySerializer(assignment, context=context).data for assignment in assignments
+        },
+        'courses': {
+            course_id: CourseSummarySerializer(course, context=context).data for course_id, course in courses.items()
+        },
+        'students': {
+            student.id: StudentSummarySerializer(student, context=context).data for student in students
+        },
+    }
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Upload session serializer; creating one checks the caller may upload to its target."""
+    assignment_id = serializers.IntegerField(write_only=True)
+    
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'target', 'assignment', 'assignment_id', 'filename', 'size', 'checksum', 'offset', 'status', 'created_at')
+        read_only_fields = ('assignment', 'offset', 'status', 'created_at')
+    
+    def validate_filename(self, value):
+        value = os.path.basename(value.replace('\\', '/')).strip()
+        if not value:
+            raise serializers.ValidationError('A file name is required.')
+        return value
+    
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.')
+        return value
+    
+    def validate_checksum(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError('Checksum must be a hex encoded SHA-256 digest.')
+        return value.lower()
+    
+    def validate(self, attrs):
+        user = self.context['request'].user
+        assignment = Assignment.objects.filter(id=attrs['assignment_id']).first()
+        if assignment is None:
+            raise serializers.ValidationError({'assignment_id': 'Assignment not found.'})
+        if attrs.get('target', 'submission') == 'assignment':
+            allowed = assignment.teacher_id == user.id
+        else:
+            allowed = user.is_student and assignment.course.students.filter(id=user.id).exists()
+        if not allowed:
+            raise serializers.ValidationError('You cannot upload files to this assignment.')
+        return attrs
+
+
 class DeadlineNotificationSerializer(serializers.ModelSerializer):
     """Deadline notification serializer."""
     class Meta:
@@ -1,14 +1,22 @@
 """
 Tests for assignments app.
 """
-from django.test import TestCase
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.test import APIClient
 from rest_framework import status
 from accounts.models import Department, Course
-from .models import Assignment, Submission
+from .models import Assignment, Submission, UploadSession
+from .uploads import OffsetMismatch, UploadError, append_chunk, complete_upload
 
 User = get_user_model()
 
@@ -102,3 +110,266 @@ class AssignmentAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreater(len(response.data), 0)
 
+    def test_list_query_count_is_constant(self):
+        students = [
+            User.objects.create_user(
+                email=f'student{i}@example.com', username=f'student{i}', password='testpass123', role='student'
+            ) for i in range(3)
+        ]
+        self.course.students.add(*students)
+        other_course = Course.objects.create(
+            name='Other Course', code='CS102', department=self.department, teacher=self.teacher
+        )
+        for i in range(20):
+            assignment = Assignment.objects.create(
+                title=f'Assignment {i}',
+                description='Test',
+                course=self.course if i % 2 else other_course,
+                teacher=self.teacher,
+                deadline=timezone.now() + timedelta(days=7)
+            )
+            for student in students[:i % 4]:
+                Submission.objects.create(assignment=assignment, student=student)
+        
+        self.client.force_authenticate(user=self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/assignments/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Page count, assignments with submission counts, courses with enrollment counts
+        self.assertLessEqual(len(queries), 3)
+        
+        rows = {row['title']: row for row in response.data['results']}
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(rows['Assignment 3']['submission_count'], 3)
+        self.assertEqual(rows['Assignment 3']['course']['student_count'], 4)
+        self.assertEqual(rows['Assignment 4']['submission_count'], 0)
+        self.assertEqual(rows['Assignment 4']['course']['student_count'], 0)
+        
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get('/api/assignments/')
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual({row['course']['student_count'] for row in response.data['results']}, {4})
+
+
+class SubmissionListTest(TestCase):
+    """Test paginated and compact submission lists."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Science', code='CS')
+        cls.teacher = User.objects.create_user(
+            email='teacher@example.com', username='teacher', password='testpass123', role='teacher'
+        )
+        cls.course = Course.objects.create(name='Test Course', code='CS101', department=department, teacher=cls.teacher)
+        cls.students = [
+            User.objects.create_user(
+                email=f'student{i}@example.com', username=f'student{i}', password='testpass123', role='student'
+            ) for i in range(25)
+        ]
+        cls.course.students.set(cls.students)
+        cls.assignment = Assignment.objects.create(
+            title='Essay', description='Test', course=cls.course, teacher=cls.teacher,
+            deadline=timezone.now() + timedelta(days=7)
+        )
+        for student in cls.students:
+            Submission.objects.create(assignment=cls.assignment, student=student, content='x' * 500)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher)
+    
+    def test_compact_list_side_loads_references(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/assignments/{self.assignment.id}/submissions/', {'compact': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Assignment lookup and its course, page count, rows, side-loaded assignments, courses, students
+        self.assertLessEqual(len(queries), 7)
+        
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+        row = response.data['results'][0]
+        self.assertEqual(row['assignment'], self.assignment.id)
+        self.assertNotIn('content', row)
+        self.assertEqual(list(response.data['assignments']), [self.assignment.id])
+        self.assertEqual(response.data['assignments'][self.assignment.id]['submission_count'], 25)
+        self.assertEqual(response.data['courses'][self.course.id]['student_count'], 25)
+        self.assertEqual(len(response.data['students']), 20)
+        self.assertIn(row['student'], response.data['students'])
+    
+    def test_full_list_is_paginated_without_per_row_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/assignments/submissions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Page count, rows with students, assignments with counts, courses
+        self.assertLessEqual(len(queries), 4)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(response.data['results'][0]['assignment']['submission_count'], 25)
+        
+        response = self.client.get('/api/assignments/submissions/', {'compact': '1', 'page': 2})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(response.data['students']), 5)
+    
+    def test_bulk_grade(self):
+        submissions = list(Submission.objects.order_by('id')[:3])
+        other = User.objects.create_user(
+            email='other@example.com', username='other', password='testpass123', role='teacher'
+        )
+        grades = [
+            {'submission_id': submissions[0].id, 'marks_obtained': 80, 'feedback': 'Good'},
+            {'submission_id': submissions[1].id, 'marks_obtained': 150},
+            {'submission_id': 999999, 'marks_obtained': 10},
+            {'submission_id': submissions[2].id, 'marks_obtained': '70'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/assignments/submissions/bulk-grade/', {'grades': grades}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Membership lookup plus the savepoint-wrapped update
+        self.assertLessEqual(len(queries), 4)
+        self.assertEqual((response.data['graded'], response.data['failed']), (2, 2))
+        self.assertEqual(
+            [row['status'] for row in response.data['results']], ['graded', 'error', 'error', 'graded']
+        )
+        
+        first, second, third = (Submission.objects.get(id=s.id) for s in submissions)
+        self.assertEqual((first.marks_obtained, first.feedback, first.is_graded), (80, 'Good', True))
+        self.assertFalse(second.is_graded)
+        self.assertEqual(third.marks_obtained, 70)
+        
+        # Teachers cannot grade other teachers' submissions
+        self.client.force_authenticate(user=other)
+        response = self.client.post('/api/assignments/submissions/bulk-grade/', {'grades': grades[:1]}, format='json')
+        self.assertEqual(response.data['results'][0]['error'], 'Submission not found.')
+        
+        self.client.force_authenticate(user=self.students[0])
+        response = self.client.post('/api/assignments/submissions/bulk-grade/', {'grades': grades[:1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ChunkedUploadTest(TestCase):
+    """Test resumable chunked uploads."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Computer Science', code='CS')
+        cls.teacher = User.objects.create_user(
+            email='teacher@example.com', username='teacher', password='testpass123', role='teacher'
+        )
+        cls.student = User.objects.create_user(
+            email='student@example.com', username='student', password='testpass123', role='student'
+        )
+        cls.outsider = User.objects.create_user(
+            email='outsider@example.com', username='outsider', password='testpass123', role='student'
+        )
+        course = Course.objects.create(name='Test Course', code='CS101', department=department, teacher=cls.teacher)
+        course.students.add(cls.student)
+        cls.assignment = Assignment.objects.create(
+            title='Essay', description='Test', course=course, teacher=cls.teacher,
+            deadline=timezone.now() + timedelta(days=7)
+        )
+        cls.content = bytes(range(256)) * 1000
+    
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = override_settings(MEDIA_ROOT=media, CHUNKED_UPLOAD_DIR=f'{media}/parts')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student)
+    
+    def start(self, content=None, **extra):
+        content = self.content if content is None else content
+        data = {
+            'assignment_id': self.assignment.id,
+            'filename': 'essay.pdf',
+            'size': len(content),
+            'checksum': hashlib.sha256(content).hexdigest(),
+            **extra
+        }
+        return self.client.post('/api/assignments/uploads/', data, format='json')
+    
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.generic(
+            'PUT', f'/api/assignments/uploads/{upload_id}/chunk/', data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+    
+    def test_resumed_upload_is_attached_to_submission(self):
+        response = self.start()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = response.data['id']
+        
+        self.assertEqual(self.put_chunk(upload_id, 0, self.content[:100000]).data['offset'], 100000)
+        # A retried or out-of-order chunk is refused with the offset to resume from
+        response = self.put_chunk(upload_id, 50000, self.content[50000:150000])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 100000)
+        self.assertEqual(self.client.get(f'/api/assignments/uploads/{upload_id}/').data['offset'], 100000)
+        
+        response = self.client.post(f'/api/assignments/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.put_chunk(upload_id, 100000, self.content[100000:])
+        response = self.client.post(f'/api/assignments/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        submission = Submission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(response.data['id'], submission.id)
+        with submission.file_attachment.open('rb') as attached:
+            self.assertEqual(attached.read(), self.content)
+    
+    def test_checksum_mismatch_resets_upload(self):
+        upload_id = self.start(checksum='0' * 64).data['id']
+        self.put_chunk(upload_id, 0, self.content)
+        response = self.client.post(f'/api/assignments/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['offset'], 0)
+        self.assertFalse(Submission.objects.exists())
+    
+    def test_second_completion_is_refused(self):
+        upload_id = self.start().data['id']
+        self.put_chunk(upload_id, 0, self.content)
+        # Loaded by a concurrent request before the first completion commits
+        stale = UploadSession.objects.get(id=upload_id)
+        response = self.client.post(f'/api/assignments/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        with self.assertRaisesMessage(UploadError, 'already complete'):
+            complete_upload(stale)
+        response = self.client.post(f'/api/assignments/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Submission.objects.count(), 1)
+    
+    def test_teacher_uploads_assignment_file(self):
+        self.client.force_authenticate(user=self.teacher)
+        content = b'brief' * 100
+        upload_id = self.start(content, target='assignment').data['id']
+        self.put_chunk(upload_id, 0, content)
+        response = self.client.post(f'/api/assignments/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Assignment.objects.get(id=self.assignment.id).file_attachment.name.endswith('.pdf'))
+    
+    def test_only_enrolled_students_can_upload(self):
+        self.client.force_authenticate(user=self.outsider)
+        self.assertEqual(self.start().status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.start(target='assignment').status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_racing_chunk_loses_offset(self):
+        upload_id = self.start().data['id']
+        
+        class RacingStream(BytesIO):
+            def read(self, size=-1):
+                # Another request advances the upload while this body is in flight
+                UploadSession.objects.filter(id=upload_id).update(offset=1000)
+                return super().read(size)
+        
+        with self.assertRaises(OffsetMismatch) as raised:
+            append_chunk(upload_id, 0, RacingStream(self.content[:2000]), 2000)
+        self.assertEqual(raised.exception.offset, 1000)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).offset, 1000)
+    
+    def test_stale_uploads_are_purged(self):
+        upload_id = self.start().data['id']
+        UploadSession.objects.filter(id=upload_id).update(updated_at=timezone.now() - timedelta(days=2))
+        call_command('purge_stale_uploads', stdout=StringIO())
+        self.assertFalse(UploadSession.objects.exists())
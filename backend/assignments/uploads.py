@@ -0,0 +1,150 @@
+"""
+Resumable chunked uploads of assignment and submission files.
+
+Each ``UploadSession`` owns a part file on local disk. Chunks are streamed
+from the request body straight into it at the session's ``offset``, a block
+at a time, so neither memory use nor request length grows with the file. On
+completion the SHA-256 of the part file is checked against the one the
+client declared and the file is attached to its submission or assignment.
+"""
+import hashlib
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from .models import Submission, UploadSession
+
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or completion request that does not fit the upload's state."""
+
+
+class OffsetMismatch(UploadError):
+    """A chunk sent for an offset other than the session's current one."""
+
+    def __init__(self, offset):
+        super().__init__(f'Expected a chunk at offset {offset}.')
+        self.offset = offset
+
+
+def part_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.id}.part')
+
+
+def start_upload(session):
+    """Create the empty part file of a newly saved session."""
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def append_chunk(session_id, offset, stream, length):
+    """
+    Write ``length`` bytes of ``stream`` at ``offset`` and return the new
+    offset. The body is streamed into the part file before anything is
+    written to the database, and the offset is then advanced with a single
+    compare-and-set, so a slow client holds no transaction or row lock while
+    it sends. Of two requests racing for the same offset only one advances
+    it; the other gets ``OffsetMismatch``, and the checksum on completion
+    catches any bytes it left behind. If the stream ends early, the bytes
+    that did arrive are kept and the client resumes after them.
+    """
+    session = UploadSession.objects.get(id=session_id)
+    if session.status != 'uploading':
+        raise UploadError('Upload is already complete.')
+    if offset != session.offset:
+        raise OffsetMismatch(session.offset)
+    if offset + length > session.size:
+        raise UploadError('Chunk extends past the declared file size.')
+
+    written = 0
+    with open(part_path(session), 'r+b') as part:
+        part.seek(offset)
+        # Drop bytes past the offset left by an interrupted earlier write
+        part.truncate()
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            part.write(block)
+            written += len(block)
+        part.flush()
+        os.fsync(part.fileno())
+
+    advanced = UploadSession.objects.filter(id=session_id, offset=offset, status='uploading').update(
+        offset=offset + written, updated_at=timezone.now()
+    )
+    if not advanced:
+        session.refresh_from_db(fields=['offset'])
+        raise OffsetMismatch(session.offset)
+    return offset + written
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_upload(session):
+    """
+    Verify the assembled file and attach it to the session's target; returns
+    the ``Submission`` or ``Assignment`` that received it. A checksum
+    mismatch discards the received bytes so the client can upload again.
+    """
+    with transaction.atomic():
+        # Lock the session so concurrent completions attach the file once
+        session = UploadSession.objects.select_for_update().get(id=session.id)
+        if session.status != 'uploading':
+            raise UploadError('Upload is already complete.')
+        if session.offset != session.size:
+            raise UploadError(f'Upload is incomplete: {session.offset} of {session.size} bytes received.')
+
+        path = part_path(session)
+        matches = file_checksum(path) == session.checksum.lower()
+        if not matches:
+            open(path, 'wb').close()
+            session.offset = 0
+            session.save(update_fields=['offset', 'updated_at'])
+        else:
+            if session.target == 'assignment':
+                target = session.assignment
+            else:
+                target, _ = Submission.objects.get_or_create(assignment=session.assignment, student=session.user)
+            with open(path, 'rb') as part:
+                target.file_attachment.save(session.filename, File(part), save=False)
+            target.save()
+            session.status = 'complete'
+            session.save(update_fields=['status', 'updated_at'])
+    if not matches:
+        raise UploadError('Checksum mismatch; the upload has been reset.')
+    os.remove(path)
+    return target
+
+
+def discard_upload(session):
+    """Delete a session and its part file."""
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def purge_stale_uploads(hours=24):
+    """Discard unfinished uploads untouched for ``hours`` and return how many."""
+    stale = UploadSession.objects.filter(
+        status='uploading', updated_at__lt=timezone.now() - timedelta(hours=hours)
+    )
+    count = 0
+    for session in stale.iterator():
+        discard_upload(session)
+        count += 1
+    return count
@@ -3,11 +3,13 @@ URLs for assignments app.
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AssignmentViewSet, SubmissionViewSet
+from .views import AssignmentViewSet, SubmissionViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
-router.register(r'', AssignmentViewSet, basename='assignment')
 router.register(r'submissions', SubmissionViewSet, basename='submission')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
+# Registered last so its detail route does not shadow the prefixes above
+router.register(r'', AssignmentViewSet, basename='assignment')
 
 urlpatterns = [
     path('', include(router.urls)),
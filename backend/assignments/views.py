@@ -1,12 +1,18 @@
 """
 Views for assignments app.
 """
-from rest_framework import viewsets, status, permissions
+from rest_framework import mixins, viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Assignment, Submission
-from .serializers import AssignmentSerializer, SubmissionSerializer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from .models import Assignment, Submission, UploadSession
+from .serializers import (
+    AssignmentSerializer, SubmissionSerializer, SubmissionRowSerializer, UploadSessionSerializer, side_load
+)
+from .uploads import OffsetMismatch, UploadError, append_chunk, complete_upload, discard_upload, start_upload
 from accounts.models import Course
 
 
@@ -18,6 +24,36 @@ class IsTeacherOrReadOnly(permissions.BasePermission):
         return request.user.is_authenticated and request.user.is_teacher
 
 
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def submission_page(view, submissions):
+    """
+    Paginated response for a submission queryset.
+    
+    With ``?compact=true`` rows carry assignment and student ids and the
+    referenced assignments, courses and students are side-loaded once per
+    page under ``assignments``, ``courses`` and ``students``.
+    """
+    compact = view.request.query_params.get('compact', '').lower() in ('1', 'true')
+    context = view.get_serializer_context()
+    if compact:
+        page = view.paginate_queryset(submissions.select_related('assignment'))
+        response = view.get_paginated_response(SubmissionRowSerializer(page, many=True, context=context).data)
+        response.data.update(side_load(page, context))
+        return response
+    
+    submissions = submissions.select_related('student').prefetch_related(
+        Prefetch('assignment', queryset=Assignment.objects.with_counts())
+    )
+    page = view.paginate_queryset(submissions)
+    return view.get_paginated_response(SubmissionSerializer(page, many=True, context=context).data)
+
+
 class AssignmentViewSet(viewsets.ModelViewSet):
     """ViewSet for assignments."""
     serializer_class = AssignmentSerializer
@@ -25,13 +61,14 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        assignments = Assignment.objects.with_counts()
         if user.is_teacher:
-            return Assignment.objects.filter(teacher=user)
+            return assignments.filter(teacher=user)
         elif user.is_student:
             # Get assignments for courses the student is enrolled in
-            return Assignment.objects.filter(course__students=user).distinct()
+            return assignments.filter(course__students=user).distinct()
         elif user.is_admin:
-            return Assignment.objects.all()
+            return assignments
         return Assignment.objects.none()
     
     def perform_create(self, serializer):
@@ -39,14 +76,12 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def submissions(self, request, pk=None):
-        """Get all submissions for an assignment."""
+        """Get the submissions for an assignment, a page at a time (supports ``?compact=true``)."""
         assignment = self.get_object()
         if not (request.user.is_teacher or request.user.is_admin):
             return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
         
-        submissions = assignment.submissions.all()
-        serializer = SubmissionSerializer(submissions, many=True)
-        return Response(serializer.data)
+        return submission_page(self, assignment.submissions.all())
 
 
 class SubmissionViewSet(viewsets.ModelViewSet):
@@ -54,6 +89,8 @@ class SubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = SubmissionSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    MAX_BULK_GRADES = 1000
+    
     def get_queryset(self):
         user = self.request.user
         if user.is_teacher or user.is_admin:
@@ -62,6 +99,9 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             return Submission.objects.filter(student=user)
         return Submission.objects.none()
     
+    def list(self, request, *args, **kwargs):
+        return submission_page(self, self.filter_queryset(self.get_queryset()))
+    
     def perform_create(self, serializer):
         serializer.save(student=self.request.user)
     
@@ -85,4 +125,138 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(submission)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-grade')
+    def bulk_grade(self, request):
+        """
+        Grade many submissions at once (teacher only). Expects ``grades``, a
+        list of ``{"submission_id", "marks_obtained", "feedback"}``; teachers
+        can only grade submissions to their own assignments. Valid rows are
+        saved together and every row gets a status.
+        """
+        if not (request.user.is_teacher or request.user.is_admin):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        grades = request.data.get('grades')
+        if not isinstance(grades, list) or not grades:
+            return Response({'error': 'grades must be a non-empty list.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(grades) > self.MAX_BULK_GRADES:
+            return Response(
+                {'error': f'At most {self.MAX_BULK_GRADES} grades can be sent at once.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        ids = [_to_id(row.get('submission_id')) if isinstance(row, dict) else None for row in grades]
+        submissions = Submission.objects.filter(id__in={i for i in ids if i is not None})
+        if not request.user.is_admin:
+            submissions = submissions.filter(assignment__teacher=request.user)
+        submissions = submissions.select_related('assignment').only(
+            'id', 'marks_obtained', 'feedback', 'is_graded', 'assignment', 'assignment__max_marks'
+        ).in_bulk()
+        
+        now = timezone.now()
+        results = []
+        graded = {}
+        for row, submission_id in zip(grades, ids):
+            submission = submissions.get(submission_id)
+            if submission is None:
+                results.append({'submission_id': submission_id, 'status': 'error', 'error': 'Submission not found.'})
+                continue
+            if submission_id in graded:
+                results.append({'submission_id': submission_id, 'status': 'error', 'error': 'Duplicate submission.'})
+                continue
+            try:
+                marks = int(row.get('marks_obtained'))
+            except (TypeError, ValueError):
+                results.append({'submission_id': submission_id, 'status': 'error', 'error': 'marks_obtained must be an integer.'})
+                continue
+            if not 0 <= marks <= submission.assignment.max_marks:
+                results.append({
+                    'submission_id': submission_id, 'status': 'error',
+                    'error': f'marks_obtained must be between 0 and {submission.assignment.max_marks}.'
+                })
+                continue
+            
+            submission.marks_obtained = marks
+            submission.feedback = row.get('feedback', '') or ''
+            submission.is_graded = True
+            submission.updated_at = now  # bulk_update skips auto_now
+            graded[submission_id] = submission
+            results.append({'submission_id': submission_id, 'status': 'graded'})
+        
+        with transaction.atomic():
+            Submission.objects.bulk_update(
+                graded.values(), ['marks_obtained', 'feedback', 'is_graded', 'updated_at'], batch_size=500
+            )
+        
+        return Response({
+            'graded': len(graded),
+            'failed': len(results) - len(graded),
+            'results': results
+        }, status=status.HTTP_200_OK)
+
 
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads of submission and assignment files.
+    
+    Create a session with the file's name, size and SHA-256, PUT the bytes to
+    ``chunk/`` with an ``Upload-Offset`` header, then POST ``complete/``. After
+    an interruption, GET the session for the offset to continue from.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        start_upload(serializer.save(user=self.request.user))
+    
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+    
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """Append the raw request body at ``Upload-Offset``; returns the new offset."""
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response({'error': 'Upload-Offset header is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({'error': 'Chunk is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.CHUNKED_UPLOAD_MAX_CHUNK:
+            return Response(
+                {'error': f'Chunks can be at most {settings.CHUNKED_UPLOAD_MAX_CHUNK} bytes.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        
+        try:
+            # Read the body as a stream; request.data would buffer it whole
+            new_offset = append_chunk(session.id, offset, request.stream, length)
+        except OffsetMismatch as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'offset': new_offset, 'size': session.size})
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Verify the checksum and attach the file to its submission or assignment."""
+        session = self.get_object()
+        try:
+            target = complete_upload(session)
+        except UploadError as e:
+            session.refresh_from_db(fields=['offset'])
+            return Response({'error': str(e), 'offset': session.offset}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': 'Upload complete.',
+            'target': session.target,
+            'id': target.id,
+            'file_attachment': request.build_absolute_uri(target.file_attachment.url)
+        }, status=status.HTTP_200_OK)
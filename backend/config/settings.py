@@ -132,6 +132,38 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Chunked uploads: parts are assembled here, outside MEDIA_ROOT, until complete
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'tmp', 'uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=500 * 1024 * 1024, cast=int)
+CHUNKED_UPLOAD_MAX_CHUNK = config('CHUNKED_UPLOAD_MAX_CHUNK', default=8 * 1024 * 1024, cast=int)
+
+# Cache
+# Answer keys, exam papers, rankings and other derived exam state are shared
+# through the cache, so every web and worker process must use the same one
+# (see exams.checks). Redis when REDIS_URL is set, otherwise the database
+# (run ``python manage.py createcachetable`` once). Entries can be evicted:
+# the database cache deletes a third of its rows once it holds more than
+# CACHE_MAX_ENTRIES, so only data that can be rebuilt from the database
+# belongs in it.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=100000, cast=int),
+            },
+        }
+    }
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
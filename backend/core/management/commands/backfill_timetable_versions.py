@@ -0,0 +1,20 @@
+"""
+Management command to wrap pre-versioning timetable entries in versions.
+"""
+from django.core.management.base import BaseCommand
+from timetable.versions import adopt_unversioned_entries
+
+
+class Command(BaseCommand):
+    help = 'Put timetable entries without a version into a published version per semester (run once after upgrading)'
+
+    def handle(self, *args, **options):
+        versions = adopt_unversioned_entries()
+        for version in versions:
+            self.stdout.write(f'Semester {version.semester} {version.academic_year}: version {version.id}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully created {len(versions)} timetable versions.'
+            )
+        )
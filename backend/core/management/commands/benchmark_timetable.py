@@ -0,0 +1,77 @@
+"""
+Management command to benchmark timetable generation on a synthetic campus.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from timetable.benchmarks import build_synthetic_campus, measure_generation
+
+
+class Command(BaseCommand):
+    help = 'Benchmark timetable generation on a synthetic campus (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=200, help='Number of courses (default: 200)')
+        parser.add_argument('--rooms', type=int, default=40, help='Number of rooms (default: 40)')
+        parser.add_argument('--days', type=int, default=5, help='Teaching days per week (default: 5)')
+        parser.add_argument('--slots-per-day', type=int, default=8, help='Time slots per day (default: 8)')
+        parser.add_argument('--students', type=int, default=3000, help='Number of students (default: 3000)')
+        parser.add_argument(
+            '--density',
+            type=float,
+            default=0.02,
+            help='Fraction of all courses each student enrolls in (default: 0.02)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the campus (default: 0)')
+        parser.add_argument('--repeat', type=int, default=3, help='Number of generation runs (default: 3)')
+        parser.add_argument(
+            '--search-budget',
+            type=float,
+            default=None,
+            help='Use the parallel multi-start search with this time budget in seconds',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the synthetic campus instead of rolling it back',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            campus = build_synthetic_campus(
+                courses=options['courses'],
+                rooms=options['rooms'],
+                days=options['days'],
+                slots_per_day=options['slots_per_day'],
+                students=options['students'],
+                enrollment_density=options['density'],
+                seed=options['seed'],
+            )
+            self.stdout.write(
+                'Synthetic campus: ' + ', '.join(f'{count} {name}' for name, count in campus.items())
+            )
+
+            search_options = None
+            if options['search_budget']:
+                search_options = {'time_budget': options['search_budget']}
+
+            runs = []
+            for run in range(1, options['repeat'] + 1):
+                stats = measure_generation(search_options)
+                runs.append(stats)
+                self.stdout.write(
+                    f"Run {run}: {stats['status']}, {stats['wall_time']:.3f}s, "
+                    f"{stats['queries']} queries, peak {stats['peak_memory_kb']} KB, "
+                    f"{stats['courses_scheduled']}/{stats['courses_total']} scheduled "
+                    f"({stats['scheduled_ratio']:.1%})"
+                )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        best = min(runs, key=lambda stats: stats['wall_time'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Best of {len(runs)}: {best['wall_time']:.3f}s, {best['queries']} queries, "
+                f"peak {best['peak_memory_kb']} KB, {best['courses_unscheduled']} courses unscheduled"
+            )
+        )
@@ -0,0 +1,48 @@
+"""
+Management command to flag near-duplicate written exam answers.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+from exams.models import Exam
+from exams.similarity import THRESHOLD, scan_exam
+
+
+class Command(BaseCommand):
+    help = 'Flag near-duplicate short and long answers of closed exams for review'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exam',
+            type=int,
+            action='append',
+            dest='exam_ids',
+            help='Scan this exam even if already scanned (repeatable)',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=THRESHOLD,
+            help=f'Minimum estimated similarity to flag (default: {THRESHOLD})',
+        )
+
+    def handle(self, *args, **options):
+        if options['exam_ids']:
+            exams = Exam.objects.filter(id__in=options['exam_ids'])
+        else:
+            # Closed exams never scanned, or scanned before they closed
+            exams = Exam.objects.filter(end_time__lte=timezone.now()).filter(
+                Q(similarity_checked_at__isnull=True) | Q(similarity_checked_at__lt=F('end_time'))
+            )
+
+        flagged = 0
+        for exam in exams:
+            pairs = scan_exam(exam, options['threshold'])
+            flagged += pairs
+            self.stdout.write(f'{exam.title}: {pairs} similar answer pairs')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully flagged {flagged} similar answer pairs.'
+            )
+        )
@@ -0,0 +1,37 @@
+"""
+Management command to save autosaved drafts of ended exams.
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from exams.drafts import DRAFT_GRACE, flush_drafts
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Save and grade autosaved answers of students who did not submit an ended exam'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=int(DRAFT_GRACE / timedelta(hours=1)),
+            help='Look at exams that ended within this many hours (default: 24)',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        exams = Exam.objects.filter(
+            end_time__lte=now,
+            end_time__gte=now - timedelta(hours=options['hours'])
+        ).select_related('course')
+
+        flushed = 0
+        for exam in exams:
+            flushed += flush_drafts(exam)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully saved drafts of {flushed} students.'
+            )
+        )
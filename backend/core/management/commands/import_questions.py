@@ -0,0 +1,41 @@
+"""
+Management command to import a question bank into an exam.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from exams.imports import QuestionImportError, import_questions, read_question_bank
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Import questions and options into an exam from a JSON or CSV question bank'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int, help='Id of the exam to add the questions to')
+        parser.add_argument('path', help='Path of the question bank file')
+        parser.add_argument(
+            '--format',
+            choices=['json', 'jsonl', 'csv'],
+            dest='file_format',
+            help='File format (default: taken from the file extension)',
+        )
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(id=options['exam_id']).first()
+        if exam is None:
+            raise CommandError(f'Exam {options["exam_id"]} not found')
+
+        file_format = options['file_format'] or options['path'].rsplit('.', 1)[-1]
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                created = import_questions(exam, read_question_bank(stream, file_format))
+        except OSError as e:
+            raise CommandError(f'Could not read {options["path"]}: {e}')
+        except QuestionImportError as e:
+            raise CommandError('Import failed:\n' + '\n'.join(e.errors))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully imported {created["questions"]} questions and '
+                f'{created["options"]} options into {exam.title}.'
+            )
+        )
@@ -0,0 +1,53 @@
+"""
+Management command to run queued timetable generation jobs.
+"""
+import time
+from django.core.management.base import BaseCommand
+from timetable.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued timetable generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling for new jobs',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls of an empty queue (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running timetable job {job.id} (semester {job.semester}, {job.academic_year})...')
+            job = run_job(job)
+            processed += 1
+
+            style = self.style.SUCCESS if job.status != 'failed' else self.style.ERROR
+            self.stdout.write(
+                style(
+                    f'Job {job.id} finished: {job.status}, '
+                    f'{job.courses_scheduled} courses scheduled in '
+                    f'{sum(job.phase_timings.values()):.2f}s'
+                )
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully processed {processed} timetable jobs.'
+            )
+        )
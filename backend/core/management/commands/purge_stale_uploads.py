@@ -0,0 +1,26 @@
+"""
+Management command to discard abandoned chunked uploads.
+"""
+from django.core.management.base import BaseCommand
+from assignments.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked uploads and their part files after a period of inactivity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Discard uploads untouched for this many hours (default: 24)',
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(options['hours'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully discarded {purged} stale uploads.'
+            )
+        )
@@ -0,0 +1,31 @@
+"""
+Management command to re-grade every submission of an exam.
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from exams.grading import regrade_exam
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Re-grade all submissions of one or more exams after an answer key change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_ids', nargs='+', type=int, help='Ids of the exams to re-grade')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.in_bulk(options['exam_ids'])
+        missing = set(options['exam_ids']) - set(exams)
+        if missing:
+            raise CommandError(f'Exam(s) not found: {", ".join(map(str, sorted(missing)))}')
+
+        for exam_id in options['exam_ids']:
+            started = time.perf_counter()
+            summary = regrade_exam(exams[exam_id])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Re-graded exam {exam_id}: {summary["students"]} students, '
+                    f'{summary["answers"]} answers, {summary["passed"]} passed '
+                    f'in {time.perf_counter() - started:.2f}s'
+                )
+            )
@@ -27,7 +27,7 @@ def student_dashboard(request):
     # Upcoming classes (next 7 days)
     today = timezone.now().date()
     week_from_now = today + timedelta(days=7)
-    upcoming_classes = Timetable.objects.filter(
+    upcoming_classes = Timetable.objects.published().filter(
         course__students=student
     ).select_related('course', 'teacher', 'room', 'time_slot').order_by('time_slot__day', 'time_slot__start_time')[:10]
     
@@ -105,7 +105,7 @@ def teacher_dashboard(request):
     
     # Today's classes
     today = timezone.now().date()
-    today_classes = Timetable.objects.filter(
+    today_classes = Timetable.objects.published().filter(
         teacher=teacher,
         time_slot__day=today.strftime('%A').lower()
     ).select_related('course', 'room', 'time_slot').order_by('time_slot__start_time')
@@ -117,7 +117,7 @@ def teacher_dashboard(request):
     ).select_related('assignment', 'student').order_by('submitted_at')[:10]
     
     # Recent assignments created
-    recent_assignments = Assignment.objects.filter(teacher=teacher).order_by('-created_at')[:5]
+    recent_assignments = Assignment.objects.with_counts().filter(teacher=teacher).order_by('-created_at')[:5]
     
     # Courses taught
     courses_taught = Course.objects.filter(teacher=teacher).count()
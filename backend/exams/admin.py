@@ -2,7 +2,7 @@
 Admin for exams app.
 """
 from django.contrib import admin
-from .models import Exam, Question, Option, StudentAnswer, AutoGradingResult
+from .models import Exam, Question, Option, StudentAnswer, AutoGradingResult, SimilarityFlag
 
 
 @admin.register(Exam)
@@ -10,7 +10,7 @@ class ExamAdmin(admin.ModelAdmin):
     list_display = ('title', 'course', 'teacher', 'start_time', 'end_time', 'is_published', 'max_marks')
     list_filter = ('is_published', 'start_time', 'course')
     search_fields = ('title', 'course__code', 'teacher__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'similarity_checked_at')
 
 
 class OptionInline(admin.TabularInline):
@@ -46,3 +46,9 @@ class AutoGradingResultAdmin(admin.ModelAdmin):
     list_filter = ('is_passed', 'graded_at', 'exam')
     search_fields = ('student__email', 'exam__title')
 
+
+@admin.register(SimilarityFlag)
+class SimilarityFlagAdmin(admin.ModelAdmin):
+    list_display = ('question', 'first_answer', 'second_answer', 'similarity', 'is_reviewed', 'created_at')
+    list_filter = ('is_reviewed', 'exam')
+    search_fields = ('exam__title', 'first_answer__student__email', 'second_answer__student__email')
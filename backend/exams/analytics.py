@@ -0,0 +1,136 @@
+"""
+Item analysis and score statistics of an exam.
+
+The answers of an exam are read once into a students x questions score
+matrix and the statistics are computed with NumPy. Results are cached until
+the exam's answers, questions or options change.
+"""
+from collections import Counter
+import numpy as np
+from django.core.cache import cache
+from .models import StudentAnswer, Question, Option
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Share of students in the upper and lower groups of the discrimination index.
+GROUP_FRACTION = 0.27
+
+SCORE_BINS = np.arange(0, 101, 10)
+
+
+def get_exam_statistics(exam):
+    """Statistics of ``exam`` from the cache, computing them on a miss."""
+    statistics = cache.get(_statistics_key(exam.id))
+    if statistics is None:
+        statistics = compute_exam_statistics(exam)
+        cache.set(_statistics_key(exam.id), statistics, CACHE_TIMEOUT)
+    return statistics
+
+
+def invalidate_exam_statistics(exam_id):
+    cache.delete(_statistics_key(exam_id))
+
+
+def compute_exam_statistics(exam):
+    """
+    Per-question difficulty, discrimination and option frequencies, plus the
+    score distribution of ``exam``.
+
+    Difficulty is the mean share of the marks obtained by students who
+    answered; discrimination is the difference in difficulty between the top
+    and bottom 27% of students by total score. Ungraded answers are left
+    out of both.
+    """
+    questions = list(Question.objects.filter(exam=exam).values_list('id', 'question_text', 'question_type', 'marks'))
+    question_col = {question[0]: col for col, question in enumerate(questions)}
+    answers = list(StudentAnswer.objects.filter(exam=exam).values_list('student_id', 'question_id', 'marks_obtained'))
+    student_ids = sorted({student_id for student_id, _, _ in answers})
+    student_row = {student_id: row for row, student_id in enumerate(student_ids)}
+
+    marks = np.array([question[3] for question in questions], dtype=float)
+    # obtained[s, q]: marks student s got for question q, NaN when unanswered or ungraded
+    obtained = np.full((len(student_ids), len(questions)), np.nan)
+    for student_id, question_id, marks_obtained in answers:
+        if marks_obtained is not None and question_id in question_col:
+            obtained[student_row[student_id], question_col[question_id]] = marks_obtained
+
+    share = np.divide(obtained, marks, out=np.full_like(obtained, np.nan), where=marks > 0)
+    graded = ~np.isnan(share)
+    totals = np.nansum(obtained, axis=1)
+    possible = (graded * marks).sum(axis=1)
+    percentages = np.divide(totals * 100, possible, out=np.zeros(len(student_ids)), where=possible > 0)
+
+    difficulty = _column_mean(share, graded)
+    group = max(1, int(round(len(student_ids) * GROUP_FRACTION)))
+    by_score = np.argsort(totals, kind='stable')
+    upper, lower = by_score[-group:], by_score[:group]
+    discrimination = _column_mean(share[upper], graded[upper]) - _column_mean(share[lower], graded[lower])
+
+    options = _option_frequencies(exam, Counter(question_id for _, question_id, _ in answers))
+
+    items = []
+    for col, (question_id, question_text, question_type, question_marks) in enumerate(questions):
+        answered = int(graded[:, col].sum())
+        items.append({
+            'question_id': question_id,
+            'question_text': question_text,
+            'question_type': question_type,
+            'marks': question_marks,
+            'graded_answers': answered,
+            'difficulty': _rounded(difficulty[col]) if answered else None,
+            'discrimination': _rounded(discrimination[col]) if answered and len(student_ids) > 1 else None,
+            'options': options.get(question_id, []),
+        })
+
+    counts, _ = np.histogram(np.clip(percentages, 0, 100), bins=SCORE_BINS)
+    return {
+        'exam_id': exam.id,
+        'students': len(student_ids),
+        'score_distribution': {
+            'bins': [f'{low}-{high}' for low, high in zip(SCORE_BINS[:-1], SCORE_BINS[1:])],
+            'counts': counts.tolist(),
+            'mean': _rounded(percentages.mean()) if len(student_ids) else None,
+            'median': _rounded(np.median(percentages)) if len(student_ids) else None,
+            'std': _rounded(percentages.std()) if len(student_ids) else None,
+            'min': _rounded(percentages.min()) if len(student_ids) else None,
+            'max': _rounded(percentages.max()) if len(student_ids) else None,
+        },
+        'questions': items,
+    }
+
+
+def _option_frequencies(exam, answer_counts):
+    """Question id -> how often each of its options was picked by the students answering it."""
+    selections = StudentAnswer.selected_options.through.objects.filter(studentanswer__exam=exam).values_list(
+        'option_id', flat=True
+    )
+    picks = Counter(selections.iterator(chunk_size=5000))
+
+    frequencies = {}
+    for option_id, question_id, option_text, is_correct in Option.objects.filter(
+        question__exam=exam
+    ).values_list('id', 'question_id', 'option_text', 'is_correct'):
+        total = answer_counts[question_id]
+        frequencies.setdefault(question_id, []).append({
+            'option_id': option_id,
+            'option_text': option_text,
+            'is_correct': is_correct,
+            'count': picks[option_id],
+            'frequency': _rounded(picks[option_id] / total) if total else 0,
+        })
+    return frequencies
+
+
+def _column_mean(values, mask):
+    counts = mask.sum(axis=0)
+    sums = np.where(mask, values, 0).sum(axis=0)
+    return np.divide(sums, counts, out=np.zeros(values.shape[1]), where=counts > 0)
+
+
+def _rounded(value):
+    return round(float(value), 4)
+
+
+def _statistics_key(exam_id):
+    return f'exams:statistics:{exam_id}'
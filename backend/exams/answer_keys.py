@@ -0,0 +1,100 @@
+"""
+Compiled exam answer keys.
+
+Grading needs, for every question of an exam, its type, marks and the set of
+correct option ids. Keys are compiled once per exam and kept both in this
+process and in the Django cache; ``signals`` drops them whenever a question
+or option of the exam is saved or deleted, and again when that change commits.
+"""
+import threading
+import uuid
+from collections import defaultdict, namedtuple
+from django.core.cache import cache
+from django.db import transaction
+from .models import Question, Option
+
+
+# Compiled answer key of one question.
+KeyEntry = namedtuple('KeyEntry', 'question_type marks correct')
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# exam id -> (cache version, compiled key), valid while the version matches.
+_local_keys = {}
+_lock = threading.Lock()
+
+
+def load_answer_key(exam):
+    """
+    Compile the answer key of an exam with two queries.
+
+    Returns a dict of question id -> ``KeyEntry`` holding the question type,
+    its marks and the frozenset of correct option ids.
+    """
+    correct = defaultdict(set)
+    for question_id, option_id in Option.objects.filter(
+        question__exam=exam, is_correct=True
+    ).values_list('question_id', 'id'):
+        correct[question_id].add(option_id)
+    return {
+        question_id: KeyEntry(question_type, marks, frozenset(correct[question_id]))
+        for question_id, question_type, marks in Question.objects.filter(exam=exam).values_list(
+            'id', 'question_type', 'marks'
+        )
+    }
+
+
+def get_answer_key(exam):
+    """
+    The compiled answer key of ``exam``, from this process, the Django cache
+    or, failing both, the database.
+
+    A per-exam version stamp in the Django cache tells every process when its
+    own copy is stale.
+    """
+    exam_id = getattr(exam, 'pk', exam)
+    version = cache.get(_version_key(exam_id))
+    if version is None:
+        version = _new_version(exam_id)
+
+    local = _local_keys.get(exam_id)
+    if local is not None and local[0] == version:
+        return local[1]
+
+    key = cache.get(_data_key(exam_id, version))
+    if key is None:
+        key = load_answer_key(exam_id)
+        cache.set(_data_key(exam_id, version), key, CACHE_TIMEOUT)
+    with _lock:
+        _local_keys[exam_id] = (version, key)
+    return key
+
+
+def invalidate_answer_key(exam_id):
+    """
+    Drop the cached answer key of an exam in every process, now and again
+    once the current transaction commits: another process may read the new
+    version before then and cache a key compiled from the old rows under it.
+    """
+    _drop_answer_key(exam_id)
+    transaction.on_commit(lambda: _drop_answer_key(exam_id))
+
+
+def _drop_answer_key(exam_id):
+    with _lock:
+        _local_keys.pop(exam_id, None)
+    _new_version(exam_id)
+
+
+def _new_version(exam_id):
+    version = uuid.uuid4().hex
+    cache.set(_version_key(exam_id), version, None)
+    return version
+
+
+def _version_key(exam_id):
+    return f'exams:answer-key-version:{exam_id}'
+
+
+def _data_key(exam_id, version):
+    return f'exams:answer-key:{exam_id}:{version}'
@@ -0,0 +1,11 @@
+"""
+App config for exams app.
+"""
+from django.apps import AppConfig
+
+
+class ExamsConfig(AppConfig):
+    name = 'exams'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,28 @@
+"""
+System checks for exams app.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Backends whose entries are private to one process.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Answer-key versions, exam papers and rank indexes must be seen by every
+    web and worker process, so the default cache has to be shared.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', PROCESS_LOCAL_CACHES[0])
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'The default cache ({backend}) is private to each process.',
+            hint='Configure a shared cache such as Redis (REDIS_URL) or the database cache.',
+            id='exams.E001',
+        )]
+    return []
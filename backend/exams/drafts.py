@@ -0,0 +1,99 @@
+"""
+Autosaved exam drafts.
+
+While an exam is in progress, autosaves only touch ``DraftAnswer`` rows: one
+per (exam, student, question), holding the latest answer to that question and
+written with a single upsert per autosave. Any number of autosaves between
+two flushes collapse into a single write of ``StudentAnswer`` rows, and two
+overlapping autosaves of different questions cannot overwrite each other.
+Drafts are flushed when the student submits, or by ``flush_exam_drafts``
+once the exam has ended.
+"""
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+from accounts.models import User
+from .models import DraftAnswer, Question, StudentAnswer
+from .utils import auto_grade_exam, save_submission
+
+
+# How long after an exam ends the flush command still looks at its drafts.
+DRAFT_GRACE = timedelta(days=1)
+
+DRAFT_FIELDS = ('question_id', 'answer_text', 'selected_option_ids')
+
+
+def get_draft(exam_id, student_id):
+    """The draft of a student as a dict of question id -> answer data."""
+    return {
+        str(answer['question_id']): answer
+        for answer in DraftAnswer.objects.filter(exam_id=exam_id, student_id=student_id).values(*DRAFT_FIELDS)
+    }
+
+
+def save_draft(exam, student_id, answers_data):
+    """
+    Upsert autosaved answers to questions of ``exam`` into the student's
+    draft and return how many questions the draft now answers.
+    """
+    answers = {}
+    for answer_data in answers_data:
+        if isinstance(answer_data, dict) and str(answer_data.get('question_id', '')).isdigit():
+            answers[int(answer_data['question_id'])] = answer_data
+    question_ids = Question.objects.filter(exam=exam, id__in=answers).values_list('id', flat=True)
+    DraftAnswer.objects.bulk_create(
+        [
+            DraftAnswer(
+                exam=exam,
+                student_id=student_id,
+                question_id=question_id,
+                answer_text=str(answers[question_id].get('answer_text', '')),
+                selected_option_ids=list(answers[question_id].get('selected_option_ids') or []),
+            )
+            for question_id in question_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['exam', 'student', 'question'],
+        update_fields=['answer_text', 'selected_option_ids', 'updated_at'],
+    )
+    return DraftAnswer.objects.filter(exam=exam, student_id=student_id).count()
+
+
+def merge_draft(exam_id, student_id, answers_data):
+    """
+    Submitted answers completed with the draft answers of questions the
+    submission leaves out.
+    """
+    draft = get_draft(exam_id, student_id)
+    submitted = {
+        str(answer_data.get('question_id')) for answer_data in answers_data if isinstance(answer_data, dict)
+    }
+    return list(answers_data) + [answer for question_id, answer in draft.items() if question_id not in submitted]
+
+
+def discard_draft(exam_id, student_id):
+    DraftAnswer.objects.filter(exam_id=exam_id, student_id=student_id).delete()
+
+
+def flush_drafts(exam):
+    """
+    Turn the drafts of students who never submitted ``exam`` into answers
+    and grade them. Returns the number of students flushed.
+    """
+    drafts = list(DraftAnswer.objects.filter(exam=exam).order_by('student_id').values('student_id', *DRAFT_FIELDS))
+    if not drafts:
+        return 0
+
+    students = User.objects.in_bulk({answer['student_id'] for answer in drafts})
+    submitted = set(StudentAnswer.objects.filter(
+        exam=exam, student_id__in=students
+    ).values_list('student_id', flat=True).distinct())
+    flushed = 0
+    for student_id, answers in groupby(drafts, key=itemgetter('student_id')):
+        student = students.get(student_id)
+        if student is not None and student_id not in submitted:
+            save_submission(exam, student, list(answers))
+            auto_grade_exam(exam, student)
+            flushed += 1
+    DraftAnswer.objects.filter(exam=exam).delete()
+    return flushed
@@ -0,0 +1,110 @@
+"""
+Whole-exam batch re-grading.
+
+Used after an answer key changes: every student's answers and result are
+recomputed at once from a students x options selection matrix instead of
+grading one submission at a time.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from .models import StudentAnswer, AutoGradingResult
+from .analytics import invalidate_exam_statistics
+from .answer_keys import invalidate_answer_key, load_answer_key
+from .rankings import drop_score_index
+
+
+def regrade_exam(exam):
+    """
+    Re-grade every submission of ``exam`` and return a summary.
+
+    Costs a fixed number of reads (answer key, answers, selections, existing
+    results) plus batched bulk writes, whatever the number of students. The
+    key is read from the database and the cached copy dropped, since a fix
+    may have bypassed the model signals (e.g. a queryset ``update``).
+    """
+    invalidate_answer_key(exam.id)
+    key = load_answer_key(exam)
+    answers = list(StudentAnswer.objects.filter(exam=exam).values_list('id', 'student_id', 'question_id'))
+    if not answers:
+        return {'students': 0, 'answers': 0, 'passed': 0, 'average_percentage': 0}
+
+    question_ids = list(key)
+    question_col = {question_id: col for col, question_id in enumerate(question_ids)}
+    student_ids = sorted({student_id for _, student_id, _ in answers})
+    student_row = {student_id: row for row, student_id in enumerate(student_ids)}
+    option_ids = [option_id for question_id in question_ids for option_id in sorted(key[question_id].correct)]
+    option_col = {option_id: col for col, option_id in enumerate(option_ids)}
+
+    # answered[s, q]: student s answered question q
+    answered = np.zeros((len(student_ids), len(question_ids)), dtype=bool)
+    answer_cells = np.array([(student_row[s], question_col[q]) for _, s, q in answers], dtype=np.intp)
+    answered[answer_cells[:, 0], answer_cells[:, 1]] = True
+
+    # selected[s, o]: student s selected correct option o in the answer to its question
+    selected = np.zeros((len(student_ids), len(option_ids)), dtype=np.int32)
+    selections = StudentAnswer.selected_options.through.objects.filter(
+        studentanswer__exam=exam,
+        option__is_correct=True,
+        option__question_id=F('studentanswer__question_id')
+    ).values_list('studentanswer__student_id', 'option_id')
+    for student_id, option_id in selections.iterator(chunk_size=5000):
+        selected[student_row[student_id], option_col[option_id]] = 1
+
+    # option_question[o, q]: correct option o belongs to question q
+    option_question = np.zeros((len(option_ids), len(question_ids)), dtype=np.int32)
+    for question_id in question_ids:
+        for option_id in key[question_id].correct:
+            option_question[option_col[option_id], question_col[question_id]] = 1
+
+    marks = np.array([key[question_id].marks for question_id in question_ids], dtype=np.int64)
+    required = option_question.sum(axis=0)
+    is_mcq = np.array([key[question_id].question_type == 'mcq' for question_id in question_ids])
+
+    # An MCQ answer is correct when every correct option of its question is selected.
+    correct = answered & is_mcq & ((selected @ option_question) >= required)
+    obtained = (correct * marks).sum(axis=1)
+    possible = (answered * marks).sum(axis=1)
+    percentage = np.divide(obtained * 100.0, possible, out=np.zeros(len(student_ids)), where=possible > 0)
+    passed = percentage >= exam.passing_marks
+    percentage = np.round(percentage, 2)
+
+    updated_answers = []
+    for answer_id, student_id, question_id in answers:
+        row, col = student_row[student_id], question_col[question_id]
+        if is_mcq[col]:
+            is_correct = bool(correct[row, col])
+            updated_answers.append(StudentAnswer(
+                id=answer_id, is_correct=is_correct, marks_obtained=int(marks[col]) if is_correct else 0
+            ))
+        else:
+            updated_answers.append(StudentAnswer(id=answer_id, is_correct=None, marks_obtained=None))
+
+    existing = dict(AutoGradingResult.objects.filter(exam=exam).values_list('student_id', 'id'))
+    results = [
+        AutoGradingResult(
+            id=existing.get(student_id),
+            exam=exam,
+            student_id=student_id,
+            total_marks_obtained=int(obtained[row]),
+            total_marks_possible=int(possible[row]),
+            percentage=float(percentage[row]),
+            is_passed=bool(passed[row])
+        )
+        for row, student_id in enumerate(student_ids)
+    ]
+    fields = ['total_marks_obtained', 'total_marks_possible', 'percentage', 'is_passed']
+
+    with transaction.atomic():
+        StudentAnswer.objects.bulk_update(updated_answers, ['is_correct', 'marks_obtained'], batch_size=1000)
+        AutoGradingResult.objects.bulk_update([result for result in results if result.id], fields, batch_size=1000)
+        AutoGradingResult.objects.bulk_create([result for result in results if not result.id], batch_size=1000)
+    invalidate_exam_statistics(exam.id)
+    drop_score_index(exam.id)
+
+    return {
+        'students': len(student_ids),
+        'answers': len(answers),
+        'passed': int(passed.sum()),
+        'average_percentage': round(float(percentage.mean()), 2),
+    }
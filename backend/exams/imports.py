@@ -0,0 +1,201 @@
+"""
+Bulk import of exam questions and options.
+
+Question banks come as JSON (an array of questions, or JSON Lines) or CSV
+and are parsed incrementally, so only one batch of questions is in memory
+at a time. Everything is written with bulk inserts inside one transaction:
+an invalid question rejects the whole file.
+"""
+import csv
+import json
+from django.db import transaction
+from .analytics import invalidate_exam_statistics
+from .answer_keys import invalidate_answer_key
+from .models import Question, Option
+from .papers import drop_exam_paper
+
+
+BATCH_SIZE = 500
+READ_SIZE = 64 * 1024
+MAX_ERRORS = 50
+
+QUESTION_TYPES = {choice for choice, _ in Question.QUESTION_TYPE_CHOICES}
+
+
+class QuestionImportError(Exception):
+    """A question bank that cannot be imported; ``errors`` lists the problems."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def iter_json(stream):
+    """
+    Questions of a JSON array or JSON Lines text stream, decoded one at a
+    time from chunks of ``READ_SIZE`` characters.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Skip separators between items
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            started = True
+            if buffer[position] == '[':
+                position += 1
+                continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                position = end
+                continue
+        if eof:
+            return
+        chunk = stream.read(READ_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_csv(stream):
+    """
+    Questions of a CSV stream with columns ``question_text``,
+    ``question_type``, ``marks``, ``order``, ``options`` (separated by ``|``)
+    and ``correct`` (1-based option numbers separated by ``|``).
+    """
+    for row in csv.DictReader(stream):
+        options = [text.strip() for text in (row.get('options') or '').split('|') if text.strip()]
+        correct = {number.strip() for number in (row.get('correct') or '').split('|')}
+        yield {
+            'question_text': row.get('question_text', ''),
+            'question_type': row.get('question_type') or 'mcq',
+            'marks': row.get('marks') or 1,
+            'order': row.get('order') or 0,
+            'options': [
+                {'option_text': text, 'is_correct': str(number) in correct, 'order': number}
+                for number, text in enumerate(options, 1)
+            ],
+        }
+
+
+def parse_question(data, number):
+    """
+    Validate one question and return ``(question fields, option fields)``;
+    raises ``QuestionImportError`` with messages prefixed by the question number.
+    """
+    if not isinstance(data, dict):
+        raise QuestionImportError([f'Question {number}: expected an object.'])
+    errors = []
+    text = str(data.get('question_text') or '').strip()
+    if not text:
+        errors.append(f'Question {number}: question_text is required.')
+    question_type = data.get('question_type') or 'mcq'
+    if question_type not in QUESTION_TYPES:
+        errors.append(f'Question {number}: unknown question_type "{question_type}".')
+    try:
+        marks = int(data.get('marks', 1))
+        order = int(data.get('order', number))
+    except (TypeError, ValueError):
+        errors.append(f'Question {number}: marks and order must be integers.')
+        marks = order = 0
+
+    options = []
+    for position, option in enumerate(data.get('options') or [], 1):
+        if not isinstance(option, dict) or not str(option.get('option_text') or '').strip():
+            errors.append(f'Question {number}: option {position} needs an option_text.')
+            continue
+        try:
+            option_order = int(option.get('order', position))
+        except (TypeError, ValueError):
+            errors.append(f'Question {number}: option {position} order must be an integer.')
+            continue
+        options.append({
+            'option_text': str(option['option_text']).strip()[:500],
+            'is_correct': option.get('is_correct') in (True, 'true', 'True', '1', 1),
+            'order': option_order,
+        })
+    if question_type == 'mcq' and not errors:
+        if len(options) < 2:
+            errors.append(f'Question {number}: multiple choice questions need at least two options.')
+        elif not any(option['is_correct'] for option in options):
+            errors.append(f'Question {number}: no option is marked correct.')
+    if errors:
+        raise QuestionImportError(errors)
+    return {'question_text': text, 'question_type': question_type, 'marks': marks, 'order': order}, options
+
+
+def import_questions(exam, questions):
+    """
+    Validate and bulk-insert an iterable of question dicts into ``exam`` and
+    return the numbers of questions and options created.
+    """
+    errors = []
+    created = {'questions': 0, 'options': 0}
+
+    def flush(batch):
+        rows = Question.objects.bulk_create([Question(exam=exam, **fields) for fields, _ in batch])
+        options = Option.objects.bulk_create([
+            Option(question=question, **option)
+            for question, (_, question_options) in zip(rows, batch)
+            for option in question_options
+        ])
+        created['questions'] += len(rows)
+        created['options'] += len(options)
+
+    with transaction.atomic():
+        batch = []
+        try:
+            for number, data in enumerate(questions, 1):
+                try:
+                    batch.append(parse_question(data, number))
+                except QuestionImportError as e:
+                    errors.extend(e.errors)
+                    if len(errors) >= MAX_ERRORS:
+                        break
+                    continue
+                if len(batch) >= BATCH_SIZE and not errors:
+                    flush(batch)
+                    batch = []
+        except (ValueError, csv.Error) as e:
+            # Malformed JSON or CSV, or a file that is not UTF-8
+            errors.append(f'Could not parse file: {e}')
+        if not errors and batch:
+            flush(batch)
+        if errors:
+            # Roll back the batches already written
+            transaction.set_rollback(True)
+        elif not created['questions']:
+            errors.append('The file contains no questions.')
+
+    if errors:
+        raise QuestionImportError(errors[:MAX_ERRORS])
+
+    # Bulk inserts send no signals, so drop what they would have.
+    invalidate_answer_key(exam.id)
+    drop_exam_paper(exam.id)
+    invalidate_exam_statistics(exam.id)
+    return created
+
+
+def read_question_bank(stream, file_format):
+    """
+    Questions of a ``json`` (array or JSON Lines) or ``csv`` text stream.
+    """
+    file_format = (file_format or '').lower()
+    if file_format in ('json', 'jsonl'):
+        return iter_json(stream)
+    if file_format == 'csv':
+        return iter_csv(stream)
+    raise QuestionImportError(['Unsupported file format; use json or csv.'])
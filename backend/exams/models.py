@@ -19,6 +19,7 @@ class Exam(models.Model):
     passing_marks = models.IntegerField(default=40)
     is_published = models.BooleanField(default=False)
     allow_retake = models.BooleanField(default=False)
+    similarity_checked_at = models.DateTimeField(null=True, blank=True)  # last near-duplicate answer scan
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -115,6 +116,23 @@ class StudentAnswer(models.Model):
         return f"{self.student.email} - {self.question}"
 
 
+class DraftAnswer(models.Model):
+    """Autosaved answer to one question of an exam in progress."""
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='draft_answers')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='draft_answers', limit_choices_to={'role': 'student'})
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='draft_answers')
+    answer_text = models.TextField(blank=True)
+    selected_option_ids = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'draft_answers'
+        unique_together = ['exam', 'student', 'question']
+    
+    def __str__(self):
+        return f"{self.student.email} - {self.question} (draft)"
+
+
 class AutoGradingResult(models.Model):
     """Auto-grading result model."""
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='grading_results')
@@ -131,9 +149,38 @@ class AutoGradingResult(models.Model):
         indexes = [
             models.Index(fields=['exam', 'student']),
             models.Index(fields=['student']),
+            models.Index(fields=['exam', '-percentage']),
         ]
         ordering = ['-graded_at']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The rank index moves a regraded result from its previous score
+        instance._loaded_percentage = dict(zip(field_names, values)).get('percentage')
+        return instance
+    
     def __str__(self):
         return f"{self.student.email} - {self.exam.title} - {self.percentage}%"
 
+
+class SimilarityFlag(models.Model):
+    """Pair of written answers to the same question that look near-identical."""
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='similarity_flags')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='similarity_flags')
+    first_answer = models.ForeignKey(StudentAnswer, on_delete=models.CASCADE, related_name='+')
+    second_answer = models.ForeignKey(StudentAnswer, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField(help_text="Estimated Jaccard similarity of the answers' shingles")
+    is_reviewed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'similarity_flags'
+        unique_together = ['first_answer', 'second_answer']
+        indexes = [
+            models.Index(fields=['exam', 'question']),
+        ]
+        ordering = ['-similarity']
+    
+    def __str__(self):
+        return f"{self.question} - {self.similarity:.2f}"
@@ -0,0 +1,97 @@
+"""
+Pre-rendered exam papers.
+
+The paper a student sees when an exam opens (questions and options, without
+answer keys) is serialized once, gzip-compressed and kept in the Django
+cache, so the start-of-exam rush costs a cache lookup per student instead of
+nested serializer work. Papers are built when an exam is published and
+dropped by ``signals`` whenever the exam, its questions or their options
+change. Like answer keys, papers are cached under a per-exam version stamp
+that is read before rendering and replaced again when the change commits,
+so a paper rendered from rows a transaction is about to change is never
+served under the new version.
+"""
+import gzip
+import hashlib
+import json
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Exam, Question, Option
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def render_exam_paper(exam):
+    """The exam paper as a dict, with no trace of which options are correct."""
+    options = {}
+    for option in Option.objects.filter(question__exam=exam).values('id', 'question_id', 'option_text', 'order'):
+        options.setdefault(option.pop('question_id'), []).append(option)
+    questions = [
+        dict(question, options=options.get(question['id'], []))
+        for question in Question.objects.filter(exam=exam).values(
+            'id', 'question_text', 'question_type', 'marks', 'order'
+        )
+    ]
+    return {
+        'id': exam.id,
+        'title': exam.title,
+        'description': exam.description,
+        'course': {'id': exam.course_id, 'code': exam.course.code, 'name': exam.course.name},
+        'start_time': exam.start_time,
+        'end_time': exam.end_time,
+        'duration_minutes': exam.duration_minutes,
+        'max_marks': exam.max_marks,
+        'questions': questions,
+    }
+
+
+def build_exam_paper(exam, version=None):
+    """Render, compress and cache the paper of ``exam``; returns ``(body, etag)``."""
+    if version is None:
+        version = _paper_version(exam.id)
+    body = gzip.compress(
+        json.dumps(render_exam_paper(exam), cls=DjangoJSONEncoder, separators=(',', ':')).encode(),
+        mtime=0
+    )
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    cache.set(_paper_key(exam.id, version), (body, etag), CACHE_TIMEOUT)
+    return body, etag
+
+
+def get_exam_paper(exam_id):
+    """
+    ``(gzip body, etag)`` of an exam's paper from the cache, building it on a
+    miss.
+    """
+    version = _paper_version(exam_id)
+    paper = cache.get(_paper_key(exam_id, version))
+    if paper is None:
+        paper = build_exam_paper(Exam.objects.select_related('course').get(id=exam_id), version)
+    return paper
+
+
+def drop_exam_paper(exam_id):
+    """Drop the cached paper of an exam, now and again once the current transaction commits."""
+    _new_version(exam_id)
+    transaction.on_commit(lambda: _new_version(exam_id))
+
+
+def _paper_version(exam_id):
+    return cache.get(_version_key(exam_id)) or _new_version(exam_id)
+
+
+def _new_version(exam_id):
+    version = uuid.uuid4().hex
+    cache.set(_version_key(exam_id), version, None)
+    return version
+
+
+def _version_key(exam_id):
+    return f'exams:paper-version:{exam_id}'
+
+
+def _paper_key(exam_id, version):
+    return f'exams:paper:{exam_id}:{version}'
@@ -0,0 +1,153 @@
+"""
+Rank and percentile index of exam results.
+
+Each exam has a ``ScoreIndex`` in the Django cache: a histogram counting its
+results per score in hundredths of a percent, packed into one array of fixed
+size. Rank and percentile are sums over the array, and a new or changed
+result moves one count, so neither the cached value nor an update grows with
+the number of students. The index is built from the database on first use,
+updated whenever a result is saved (see ``signals``) and rebuilt whenever its
+count of results disagrees with the database, e.g. after an update was lost.
+Top-N lists are read from the database.
+"""
+import time
+from contextlib import contextmanager
+import numpy as np
+from django.core.cache import cache
+from .models import AutoGradingResult
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Bumped whenever the layout of ``ScoreIndex`` changes.
+INDEX_VERSION = 2
+
+# How long an update may hold an exam's index, and how long others wait for it.
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 2 * LOCK_TIMEOUT
+
+# Scores are percentages with two decimals, counted in hundredths.
+SCALE = 100
+MAX_SCORE = 100 * SCALE
+
+
+class ScoreIndex:
+    """Histogram of one exam's scores."""
+
+    def __init__(self, exam_id, scores=()):
+        self.exam_id = exam_id
+        self.counts = np.bincount(
+            np.array([_hundredths(score) for score in scores], dtype=np.int64), minlength=MAX_SCORE + 1
+        ).astype(np.int32)
+        self.total = int(self.counts.sum())
+
+    def __len__(self):
+        return self.total
+
+    def record(self, score, previous=None):
+        """Add a new score, or move ``previous`` to ``score``."""
+        self.counts[_hundredths(score)] += 1
+        if previous is None:
+            self.total += 1
+        else:
+            self.counts[_hundredths(previous)] -= 1
+
+    def rank(self, score):
+        """1 + the number of results strictly above ``score``; ties share a rank."""
+        return int(self.counts[_hundredths(score) + 1:].sum()) + 1
+
+    def percentile(self, score):
+        """Percentile rank: share of results below ``score``, counting ties as half."""
+        if not self.total:
+            return None
+        score = _hundredths(score)
+        below = int(self.counts[:score].sum())
+        return round((below + int(self.counts[score]) / 2) / self.total * 100, 2)
+
+    def percentiles(self, scores):
+        """Percentile of each of ``scores``."""
+        return {score: self.percentile(score) for score in scores}
+
+    def top(self, n):
+        """``(student_id, score, rank)`` of the ``n`` best results."""
+        rows = AutoGradingResult.objects.filter(exam_id=self.exam_id).order_by(
+            '-percentage', 'student_id'
+        ).values_list('student_id', 'percentage')[:n]
+        leaders = []
+        for position, (student_id, percentage) in enumerate(rows, 1):
+            score = float(percentage)
+            rank = leaders[-1][2] if leaders and leaders[-1][1] == score else position
+            leaders.append((student_id, score, rank))
+        return leaders
+
+    def standing(self, score):
+        """Rank, percentile and cohort size of a result of ``score``."""
+        return {'rank': self.rank(score), 'percentile': self.percentile(score), 'out_of': self.total}
+
+
+def get_score_index(exam_id):
+    """
+    The score index of an exam, checked against the database's count of
+    results and rebuilt with one query when it is missing or disagrees.
+    """
+    index = cache.get(_index_key(exam_id))
+    count = AutoGradingResult.objects.filter(exam_id=exam_id).count()
+    if index is None or index.total != count:
+        with _exam_lock(exam_id):
+            index = ScoreIndex(exam_id, AutoGradingResult.objects.filter(exam_id=exam_id).values_list(
+                'percentage', flat=True
+            ))
+            cache.set(_index_key(exam_id), index, CACHE_TIMEOUT)
+    return index
+
+
+def record_score(exam_id, score, previous=None):
+    """
+    Update a cached index with a new result, or one changed from
+    ``previous``. An index that is not cached is left to be built from the
+    database. Concurrent updates wait their turn for the exam's lock; the
+    index is only dropped if the lock stays busy longer than anyone may
+    hold it.
+    """
+    with _exam_lock(exam_id) as locked:
+        if not locked:
+            drop_score_index(exam_id)
+            return
+        index = cache.get(_index_key(exam_id))
+        if index is not None:
+            index.record(score, previous)
+            cache.set(_index_key(exam_id), index, CACHE_TIMEOUT)
+
+
+def drop_score_index(exam_id):
+    cache.delete(_index_key(exam_id))
+
+
+@contextmanager
+def _exam_lock(exam_id):
+    """Hold the exam's index lock, waiting up to ``LOCK_WAIT``; yields whether it was acquired."""
+    deadline = time.monotonic() + LOCK_WAIT
+    delay = 0.005
+    while not cache.add(_lock_key(exam_id), 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            yield False
+            return
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+    try:
+        yield True
+    finally:
+        cache.delete(_lock_key(exam_id))
+
+
+def _hundredths(score):
+    # Round like the stored DecimalField so ties match the database
+    return min(max(round(float(score) * SCALE), 0), MAX_SCORE)
+
+
+def _index_key(exam_id):
+    return f'exams:ranking:{exam_id}:v{INDEX_VERSION}'
+
+
+def _lock_key(exam_id):
+    return f'exams:ranking-lock:{exam_id}'
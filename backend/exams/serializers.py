@@ -2,7 +2,7 @@
 Serializers for exams app.
 """
 from rest_framework import serializers
-from .models import Exam, Question, Option, StudentAnswer, AutoGradingResult
+from .models import Exam, Question, Option, StudentAnswer, AutoGradingResult, SimilarityFlag
 from accounts.serializers import CourseSerializer, UserSerializer
 
 
@@ -36,7 +36,7 @@ class ExamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Exam
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'teacher')
+        read_only_fields = ('created_at', 'updated_at', 'teacher', 'similarity_checked_at')
     
     def get_teacher_name(self, obj):
         return f"{obj.teacher.first_name} {obj.teacher.last_name}" if obj.teacher else None
@@ -85,3 +85,15 @@ class AutoGradingResultSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('graded_at',)
 
+
+class SimilarityFlagSerializer(serializers.ModelSerializer):
+    """Similar answer pair serializer."""
+    first_student = serializers.EmailField(source='first_answer.student.email', read_only=True)
+    first_answer_text = serializers.CharField(source='first_answer.answer_text', read_only=True)
+    second_student = serializers.EmailField(source='second_answer.student.email', read_only=True)
+    second_answer_text = serializers.CharField(source='second_answer.answer_text', read_only=True)
+    
+    class Meta:
+        model = SimilarityFlag
+        fields = '__all__'
+        read_only_fields = ('exam', 'question', 'first_answer', 'second_answer', 'similarity', 'created_at')
@@ -0,0 +1,66 @@
+"""
+Signal handlers for exams app.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .analytics import invalidate_exam_statistics
+from .answer_keys import invalidate_answer_key
+from .models import Exam, Question, Option, StudentAnswer, AutoGradingResult
+from .papers import build_exam_paper, drop_exam_paper
+from .rankings import drop_score_index, record_score
+
+
+@receiver(post_save, sender=Exam)
+def exam_saved(sender, instance, **kwargs):
+    """Drop the paper of a saved exam and, if it is published, render it once the save commits."""
+    invalidate_exam_statistics(instance.id)
+    drop_exam_paper(instance.id)
+    if instance.is_published:
+        transaction.on_commit(lambda: build_exam_paper(instance))
+
+
+@receiver(post_delete, sender=Exam)
+def exam_deleted(sender, instance, **kwargs):
+    drop_exam_paper(instance.id)
+    invalidate_exam_statistics(instance.id)
+    drop_score_index(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """A question's type or marks feed its exam's answer key, paper and statistics."""
+    invalidate_answer_key(instance.exam_id)
+    drop_exam_paper(instance.exam_id)
+    invalidate_exam_statistics(instance.exam_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance, **kwargs):
+    """An option's text and correctness feed its exam's paper, answer key and statistics."""
+    if Option.question.is_cached(instance):
+        exam_id = instance.question.exam_id
+    else:
+        exam_id = Question.objects.filter(id=instance.question_id).values_list('exam_id', flat=True).first()
+    if exam_id is not None:
+        invalidate_answer_key(exam_id)
+        drop_exam_paper(exam_id)
+        invalidate_exam_statistics(exam_id)
+
+
+@receiver([post_save, post_delete], sender=StudentAnswer)
+def answer_changed(sender, instance, **kwargs):
+    """Manually graded or removed answers change the exam statistics."""
+    invalidate_exam_statistics(instance.exam_id)
+
+
+@receiver(post_save, sender=AutoGradingResult)
+def result_saved(sender, instance, **kwargs):
+    """Keep the exam's rank index in step with each graded submission."""
+    record_score(instance.exam_id, instance.percentage, getattr(instance, '_loaded_percentage', None))
+    instance._loaded_percentage = instance.percentage
+
+
+@receiver(post_delete, sender=AutoGradingResult)
+def result_deleted(sender, instance, **kwargs):
+    drop_score_index(instance.exam_id)
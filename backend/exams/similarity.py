@@ -0,0 +1,121 @@
+"""
+Near-duplicate detection for written answers.
+
+Each short or long answer is reduced to character shingles and a MinHash
+signature; signatures are split into bands and hashed into locality
+sensitive buckets, so only answers sharing a bucket are compared. Pairs
+whose estimated similarity reaches the threshold are stored as
+``SimilarityFlag`` rows for the teacher to review.
+"""
+import re
+import zlib
+from collections import defaultdict
+from itertools import combinations
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .models import Exam, StudentAnswer, SimilarityFlag
+
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+# 16 bands of 8 rows put the LSH threshold at about (1/16) ** (1/8) = 0.71.
+BANDS = 16
+THRESHOLD = 0.8
+# Answers shorter than this (after normalizing) are too short to judge.
+MIN_LENGTH = 30
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(42)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashes of the character ``size``-grams of normalized ``text``."""
+    text = normalize(text)
+    return np.array(
+        sorted({zlib.crc32(text[i:i + size].encode()) for i in range(max(1, len(text) - size + 1))}),
+        dtype=np.uint64
+    )
+
+
+def minhash(hashes):
+    """MinHash signature of a set of 32-bit shingle hashes."""
+    # (a * x + b) mod p over every permutation and shingle at once; the
+    # operands stay below 2**63 so the uint64 products do not overflow.
+    values = (np.outer(_A, hashes) + _B[:, None]) % _PRIME
+    return (values & _MAX_HASH).min(axis=1)
+
+
+def candidate_pairs(signatures, bands=BANDS):
+    """Index pairs of signatures that share at least one LSH band bucket."""
+    rows = NUM_PERM // bands
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for position, signature in enumerate(signatures):
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(position)
+        for members in buckets.values():
+            pairs.update(combinations(members, 2))
+    return pairs
+
+
+def similar_answers(answers, threshold=THRESHOLD):
+    """
+    ``(first_id, second_id, similarity)`` for near-duplicate answers among
+    ``(answer_id, text)`` pairs, in near-linear time.
+    """
+    answers = [(answer_id, text) for answer_id, text in answers if len(normalize(text)) >= MIN_LENGTH]
+    if len(answers) < 2:
+        return []
+    signatures = [minhash(shingles(text)) for _, text in answers]
+    found = []
+    for first, second in candidate_pairs(signatures):
+        similarity = float(np.mean(signatures[first] == signatures[second]))
+        if similarity >= threshold:
+            found.append((answers[first][0], answers[second][0], round(similarity, 4)))
+    return found
+
+
+def scan_exam(exam, threshold=THRESHOLD):
+    """
+    Flag near-duplicate written answers of ``exam`` and return the number of
+    pairs flagged. Flags from earlier scans that no longer hold are removed
+    unless a teacher has reviewed them.
+    """
+    by_question = defaultdict(list)
+    answers = StudentAnswer.objects.filter(
+        exam=exam, question__question_type__in=['short_answer', 'long_answer']
+    ).exclude(answer_text='').order_by('question_id', 'id').values_list('id', 'question_id', 'answer_text')
+    for answer_id, question_id, text in answers.iterator(chunk_size=2000):
+        by_question[question_id].append((answer_id, text))
+
+    flags = [
+        SimilarityFlag(
+            exam=exam,
+            question_id=question_id,
+            first_answer_id=min(first, second),
+            second_answer_id=max(first, second),
+            similarity=similarity
+        )
+        for question_id, question_answers in by_question.items()
+        for first, second, similarity in similar_answers(question_answers, threshold)
+    ]
+    found = {(flag.first_answer_id, flag.second_answer_id) for flag in flags}
+    with transaction.atomic():
+        stale = [
+            flag_id for flag_id, first, second in SimilarityFlag.objects.filter(
+                exam=exam, is_reviewed=False
+            ).values_list('id', 'first_answer_id', 'second_answer_id')
+            if (first, second) not in found
+        ]
+        SimilarityFlag.objects.filter(id__in=stale).delete()
+        SimilarityFlag.objects.bulk_create(flags, batch_size=1000, ignore_conflicts=True)
+        Exam.objects.filter(id=exam.id).update(similarity_checked_at=timezone.now())
+    return len(flags)
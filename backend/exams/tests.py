@@ -0,0 +1,704 @@
+"""
+Tests for exams app.
+"""
+import csv
+import io
+import os
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import numpy as np
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from accounts.models import Department, Course
+from .models import Exam, Question, Option, StudentAnswer, DraftAnswer, AutoGradingResult, SimilarityFlag
+from .answer_keys import get_answer_key
+from .checks import check_shared_cache
+from . import answer_keys, imports, papers, rankings, similarity
+from .grading import regrade_exam
+from .rankings import get_score_index
+from .utils import auto_grade_exam
+
+User = get_user_model()
+
+
+def app_queries(context):
+    """
+    Captured queries other than savepoints and those of the database cache
+    backend, which would be cache round trips with Redis.
+    """
+    return [
+        query for query in context.captured_queries
+        if 'django_cache' not in query['sql'] and 'SAVEPOINT' not in query['sql']
+    ]
+
+
+class ExamTestMixin:
+    """Exam with MCQ and written questions shared by the exam tests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            email='teacher@example.com', username='teacher', password='testpass123', role='teacher'
+        )
+        cls.students = [
+            User.objects.create_user(
+                email=f'student{i}@example.com', username=f'student{i}', password='testpass123', role='student'
+            ) for i in range(3)
+        ]
+        department = Department.objects.create(name='Computer Science', code='CS')
+        cls.course = Course.objects.create(name='Course', code='CS101', department=department, teacher=cls.teacher)
+        cls.course.students.set(cls.students)
+        now = timezone.now()
+        cls.exam = Exam.objects.create(
+            title='Midterm',
+            course=cls.course,
+            teacher=cls.teacher,
+            start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(hours=1),
+            duration_minutes=60,
+            passing_marks=50,
+            is_published=True
+        )
+        cls.questions = []
+        cls.correct = []
+        cls.wrong = []
+        for i in range(3):
+            question, correct, wrong = cls.add_mcq(i)
+            cls.questions.append(question)
+            cls.correct.append(correct)
+            cls.wrong.append(wrong)
+        cls.written = Question.objects.create(
+            exam=cls.exam, question_text='Explain.', question_type='short_answer', marks=5, order=10
+        )
+
+    @classmethod
+    def add_mcq(cls, order, marks=2):
+        question = Question.objects.create(exam=cls.exam, question_text=f'Q{order}', marks=marks, order=order)
+        correct = Option.objects.create(question=question, option_text='Right', is_correct=True, order=0)
+        wrong = Option.objects.create(question=question, option_text='Wrong', order=1)
+        return question, correct, wrong
+
+    def answer(self, student, question, options=(), text=''):
+        answer = StudentAnswer.objects.create(exam=self.exam, student=student, question=question, answer_text=text)
+        answer.selected_options.set(options)
+        return answer
+
+
+class AutoGradeTest(ExamTestMixin, TestCase):
+    """Test auto-grading of a single submission."""
+
+    def test_grades_mcq_and_leaves_written_answers(self):
+        student = self.students[0]
+        self.answer(student, self.questions[0], [self.correct[0]])
+        self.answer(student, self.questions[1], [self.wrong[1]])
+        self.answer(student, self.questions[2], [self.correct[2], self.wrong[2]])
+        self.answer(student, self.written, text='Because.')
+
+        result = auto_grade_exam(self.exam, student)
+
+        self.assertEqual(result['total_marks_obtained'], 4)
+        self.assertEqual(result['total_marks_possible'], 11)
+        self.assertFalse(result['is_passed'])
+        answers = {answer.question_id: answer for answer in StudentAnswer.objects.filter(student=student)}
+        self.assertTrue(answers[self.questions[0].id].is_correct)
+        self.assertEqual(answers[self.questions[1].id].marks_obtained, 0)
+        self.assertIsNone(answers[self.written.id].is_correct)
+        self.assertEqual(AutoGradingResult.objects.get(student=student).total_marks_obtained, 4)
+
+    def test_query_count_is_independent_of_question_count(self):
+        student = self.students[0]
+        for question, option in zip(self.questions, self.correct):
+            self.answer(student, question, [option])
+        auto_grade_exam(self.exam, student)
+        with CaptureQueriesContext(connection) as small:
+            auto_grade_exam(self.exam, student)
+
+        for order in range(3, 10):
+            question, correct, _ = self.add_mcq(order)
+            self.answer(student, question, [correct])
+        auto_grade_exam(self.exam, student)
+        with CaptureQueriesContext(connection) as large:
+            result = auto_grade_exam(self.exam, student)
+
+        self.assertEqual(result['total_marks_obtained'], 20)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class SubmitExamTest(ExamTestMixin, TestCase):
+    """Test the exam submission write path."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.students[0])
+
+    def submit(self, answers):
+        return self.client.post(f'/api/exams/{self.exam.id}/submit/', {'answers': answers}, format='json')
+
+    def test_submit_saves_and_grades_answers(self):
+        response = self.submit([
+            {'question_id': self.questions[0].id, 'selected_option_ids': [self.correct[0].id]},
+            {'question_id': self.questions[1].id, 'selected_option_ids': [self.wrong[1].id, self.correct[0].id]},
+            {'question_id': self.written.id, 'answer_text': 'Because.'},
+            {'question_id': 999999, 'selected_option_ids': [self.correct[2].id]},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['result']['total_marks_obtained'], 2)
+        answers = {answer.question_id: answer for answer in StudentAnswer.objects.filter(student=self.students[0])}
+        self.assertEqual(set(answers), {self.questions[0].id, self.questions[1].id, self.written.id})
+        # Options of other questions are dropped
+        self.assertEqual(list(answers[self.questions[1].id].selected_options.all()), [self.wrong[1]])
+        self.assertEqual(answers[self.written.id].answer_text, 'Because.')
+
+    def test_submit_rejects_second_attempt(self):
+        self.submit([{'question_id': self.questions[0].id, 'selected_option_ids': [self.correct[0].id]}])
+        response = self.submit([{'question_id': self.questions[0].id, 'selected_option_ids': [self.wrong[0].id]}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_is_independent_of_answer_count(self):
+        def answers(questions, options):
+            return [
+                {'question_id': question.id, 'selected_option_ids': [option.id]}
+                for question, option in zip(questions, options)
+            ]
+
+        get_answer_key(self.exam)
+        with CaptureQueriesContext(connection) as small:
+            self.submit(answers(self.questions[:1], self.correct[:1]))
+
+        questions, options = [], []
+        for order in range(3, 10):
+            question, correct, _ = self.add_mcq(order)
+            questions.append(question)
+            options.append(correct)
+        get_answer_key(self.exam)
+        self.client.force_authenticate(user=self.students[1])
+        with CaptureQueriesContext(connection) as large:
+            self.submit(answers(self.questions + questions, self.correct + options))
+
+        self.assertEqual(StudentAnswer.objects.filter(student=self.students[1]).count(), 10)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class AutosaveTest(ExamTestMixin, TestCase):
+    """Test autosaved exam drafts."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.students[0])
+        self.url = f'/api/exams/{self.exam.id}/autosave/'
+
+    def autosave(self, *answers):
+        return self.client.post(self.url, {'answers': list(answers)}, format='json')
+
+    def test_autosaves_are_coalesced_without_answer_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            for text in ('B', 'Be', 'Because'):
+                self.autosave({'question_id': self.written.id, 'answer_text': text})
+            response = self.autosave({'question_id': self.questions[0].id, 'selected_option_ids': [self.wrong[0].id]})
+        self.assertEqual(response.data['saved'], 2)
+        self.assertFalse(StudentAnswer.objects.exists())
+        # One upsert of draft rows per autosave
+        writes = [
+            query['sql'] for query in app_queries(queries)
+            if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        self.assertEqual(len(writes), 4)
+        self.assertTrue(all('draft_answers' in sql for sql in writes), writes)
+
+        response = self.client.get(self.url)
+        self.assertIn({'question_id': self.written.id, 'answer_text': 'Because', 'selected_option_ids': []},
+                      response.data['answers'])
+
+    def test_submit_flushes_draft(self):
+        self.autosave(
+            {'question_id': self.written.id, 'answer_text': 'Because'},
+            {'question_id': self.questions[0].id, 'selected_option_ids': [self.wrong[0].id]},
+        )
+        self.client.post(f'/api/exams/{self.exam.id}/submit/', {'answers': [
+            {'question_id': self.questions[0].id, 'selected_option_ids': [self.correct[0].id]},
+        ]}, format='json')
+
+        answers = {answer.question_id: answer for answer in StudentAnswer.objects.filter(student=self.students[0])}
+        self.assertEqual(answers[self.written.id].answer_text, 'Because')
+        self.assertTrue(answers[self.questions[0].id].is_correct)
+        self.assertEqual(self.client.get(self.url).data['answers'], [])
+
+    def test_drafts_are_flushed_after_exam_ends(self):
+        self.autosave({'question_id': self.questions[0].id, 'selected_option_ids': [self.correct[0].id]})
+        Exam.objects.filter(id=self.exam.id).update(end_time=timezone.now() - timedelta(minutes=1))
+        call_command('flush_exam_drafts', stdout=StringIO())
+
+        result = AutoGradingResult.objects.get(exam=self.exam, student=self.students[0])
+        self.assertEqual(result.total_marks_obtained, 2)
+
+    def test_drafts_survive_cache_eviction(self):
+        self.autosave({'question_id': self.questions[0].id, 'selected_option_ids': [self.correct[0].id]})
+        cache.clear()
+        Exam.objects.filter(id=self.exam.id).update(end_time=timezone.now() - timedelta(minutes=1))
+        call_command('flush_exam_drafts', stdout=StringIO())
+        self.assertTrue(AutoGradingResult.objects.filter(exam=self.exam, student=self.students[0]).exists())
+        self.assertFalse(DraftAnswer.objects.exists())
+
+
+class ExamAnalyticsTest(ExamTestMixin, TestCase):
+    """Test item analysis statistics."""
+
+    def setUp(self):
+        # student0 gets everything right, student1 half, student2 nothing
+        picks = [
+            [self.correct[0], self.correct[1]],
+            [self.correct[0], self.wrong[1]],
+            [self.wrong[0], self.wrong[1]],
+        ]
+        for student, options in zip(self.students, picks):
+            for question, option in zip(self.questions, options):
+                self.answer(student, question, [option])
+            auto_grade_exam(self.exam, student)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher)
+        self.url = f'/api/exams/{self.exam.id}/analytics/'
+
+    def test_item_statistics(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['students'], 3)
+        first, second, unanswered = response.data['questions'][:3]
+        self.assertAlmostEqual(first['difficulty'], 2 / 3, places=3)
+        self.assertAlmostEqual(second['difficulty'], 1 / 3, places=3)
+        self.assertEqual(first['discrimination'], 1.0)
+        self.assertIsNone(unanswered['difficulty'])
+        self.assertEqual([option['count'] for option in second['options']], [1, 2])
+        self.assertEqual(response.data['score_distribution']['counts'][0], 1)
+        self.assertEqual(response.data['score_distribution']['counts'][-1], 1)
+
+    def test_statistics_are_cached_until_answers_change(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse(any('student_answers' in query['sql'] for query in queries.captured_queries))
+
+        answer = StudentAnswer.objects.get(student=self.students[2], question=self.questions[0])
+        answer.selected_options.set([self.correct[0]])
+        auto_grade_exam(self.exam, self.students[2])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['questions'][0]['difficulty'], 1.0)
+
+    def test_students_cannot_see_statistics(self):
+        self.client.force_authenticate(user=self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ExportResultsTest(ExamTestMixin, TestCase):
+    """Test streaming result exports."""
+
+    def setUp(self):
+        for student, option in zip(self.students[:2], [self.correct[0], self.wrong[0]]):
+            self.answer(student, self.questions[0], [option])
+            self.answer(student, self.written, text='Because.')
+            auto_grade_exam(self.exam, student)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher)
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/exams/{self.exam.id}/export/{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_csv_export(self):
+        rows = self.export()
+        self.assertEqual(rows[0][:3], ['Email', 'First name', 'Last name'])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual([row[3] for row in rows[1:]], ['2', '0'])
+
+    def test_per_question_columns(self):
+        rows = self.export('?questions=true')
+        self.assertEqual(rows[0][-4:], ['Q1 marks', 'Q2 marks', 'Q3 marks', 'Q4 marks'])
+        self.assertEqual(rows[1][-4:], ['2', '', '', ''])
+        self.assertEqual(rows[2][-4:], ['0', '', '', ''])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(f'/api/exams/{self.exam.id}/export/?file_format=pdf')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RankingTest(ExamTestMixin, TestCase):
+    """Test the rank and percentile index."""
+
+    def setUp(self):
+        self.client = APIClient()
+        for student, options in zip(self.students, [self.correct, self.wrong, self.correct[:1] + self.wrong[1:]]):
+            for question, option in zip(self.questions, options):
+                self.answer(student, question, [option])
+            auto_grade_exam(self.exam, student)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_student_sees_rank_and_percentile(self):
+        self.client.force_authenticate(user=self.students[2])
+        response = self.client.get(f'/api/exams/{self.exam.id}/results/')
+        self.assertEqual(response.data['rank'], 2)
+        self.assertEqual(response.data['percentile'], 50.0)
+        self.assertEqual(response.data['out_of'], 3)
+
+    def test_index_follows_new_grades(self):
+        get_score_index(self.exam.id)
+        answer = StudentAnswer.objects.get(student=self.students[1], question=self.questions[0])
+        answer.selected_options.set([self.correct[0]])
+        auto_grade_exam(self.exam, self.students[1])
+        with CaptureQueriesContext(connection) as queries:
+            index = get_score_index(self.exam.id)
+        # Only the count of results is checked; the index itself was updated in place
+        self.assertEqual(len(app_queries(queries)), 1)
+        standing = index.standing(AutoGradingResult.objects.get(student=self.students[1]).percentage)
+        self.assertEqual(standing['rank'], 2)
+        self.assertEqual(standing['percentile'], 33.33)
+
+    def test_index_missing_results_is_rebuilt(self):
+        # An index that lost updates, e.g. one evicted and rebuilt mid-rush
+        cache.set(rankings._index_key(self.exam.id), rankings.ScoreIndex(self.exam.id, [100]))
+        index = get_score_index(self.exam.id)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.standing(0), {'rank': 3, 'percentile': 16.67, 'out_of': 3})
+
+    def test_busy_index_is_waited_for_not_dropped(self):
+        get_score_index(self.exam.id)
+        cache.add(rankings._lock_key(self.exam.id), 1, rankings.LOCK_TIMEOUT)
+
+        def release(delay):
+            # Another worker finishes its update while this one sleeps
+            cache.delete(rankings._lock_key(self.exam.id))
+
+        with mock.patch.object(rankings.time, 'sleep', side_effect=release) as sleep:
+            rankings.record_score(self.exam.id, 100, previous=0)
+        self.assertTrue(sleep.called)
+        index = cache.get(rankings._index_key(self.exam.id))
+        self.assertEqual(index.standing(100), {'rank': 1, 'percentile': 66.67, 'out_of': 3})
+
+    def test_teacher_top_n(self):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(f'/api/exams/{self.exam.id}/results/?top=2')
+        self.assertEqual(response.data['out_of'], 3)
+        self.assertEqual(
+            [(row['rank'], row['student']['email']) for row in response.data['top']],
+            [(1, 'student0@example.com'), (2, 'student2@example.com')]
+        )
+
+
+class SimilarAnswersTest(ExamTestMixin, TestCase):
+    """Test near-duplicate answer detection."""
+
+    ESSAY = (
+        'Photosynthesis converts light energy into chemical energy stored in glucose, '
+        'using carbon dioxide and water and releasing oxygen as a by-product.'
+    )
+
+    def setUp(self):
+        self.copied = [
+            self.answer(self.students[0], self.written, text=self.ESSAY),
+            self.answer(self.students[1], self.written, text=self.ESSAY.replace('by-product', 'byproduct') + '!'),
+        ]
+        self.answer(self.students[2], self.written, text='Plants make food from sunlight in their leaves, mostly.')
+
+    def test_signatures_estimate_similarity(self):
+        same = similarity.minhash(similarity.shingles(self.ESSAY))
+        other = similarity.minhash(similarity.shingles('Completely different words about the French revolution.'))
+        self.assertTrue((same == similarity.minhash(similarity.shingles(self.ESSAY))).all())
+        self.assertLess(np.mean(same == other), 0.2)
+
+    def test_scan_flags_copied_answers(self):
+        call_command('detect_similar_answers', '--exam', str(self.exam.id), stdout=StringIO())
+        flag = SimilarityFlag.objects.get()
+        self.assertEqual({flag.first_answer_id, flag.second_answer_id}, {answer.id for answer in self.copied})
+        self.assertGreaterEqual(flag.similarity, similarity.THRESHOLD)
+        self.assertIsNotNone(Exam.objects.get(id=self.exam.id).similarity_checked_at)
+
+    def test_teacher_reviews_flags(self):
+        similarity.scan_exam(self.exam)
+        client = APIClient()
+        client.force_authenticate(user=self.teacher)
+        url = f'/api/exams/{self.exam.id}/similar-answers/'
+        response = client.get(url)
+        self.assertEqual(len(response.data['flags']), 1)
+        self.assertEqual(response.data['flags'][0]['first_student'], 'student0@example.com')
+
+        client.patch(url, {'flag_id': response.data['flags'][0]['id'], 'is_reviewed': True}, format='json')
+        self.assertEqual(client.get(url).data['flags'], [])
+        similarity.scan_exam(self.exam)
+        self.assertTrue(SimilarityFlag.objects.get().is_reviewed)
+
+    def test_admin_reviews_flags_by_numeric_id(self):
+        similarity.scan_exam(self.exam)
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(
+            email='admin@example.com', username='admin', password='testpass123', role='admin'
+        ))
+        url = f'/api/exams/{self.exam.id}/similar-answers/'
+        response = client.patch(url, {'flag_id': 'abc'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.patch(url, {'flag_id': SimilarityFlag.objects.get().id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_reviewed'])
+
+
+class ExamPaperTest(ExamTestMixin, TestCase):
+    """Test the pre-rendered exam paper."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.students[0])
+
+    def test_paper_hides_answers(self):
+        response = self.client.get(f'/api/exams/{self.exam.id}/paper/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        paper = json.loads(response.content)
+        self.assertEqual(len(paper['questions']), 4)
+        self.assertEqual(len(paper['questions'][0]['options']), 2)
+        self.assertNotIn('is_correct', response.content.decode())
+
+    def test_paper_is_served_from_cache_with_etag(self):
+        response = self.client.get(f'/api/exams/{self.exam.id}/paper/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/exams/{self.exam.id}/paper/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(any('questions' in query['sql'] for query in queries.captured_queries))
+
+    def test_question_change_updates_paper(self):
+        etag = self.client.get(f'/api/exams/{self.exam.id}/paper/')['ETag']
+        self.written.question_text = 'Explain in detail.'
+        self.written.save()
+        response = self.client.get(f'/api/exams/{self.exam.id}/paper/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Explain in detail.', response.content.decode())
+
+    def test_paper_cached_before_commit_is_dropped_on_commit(self):
+        stale = papers.get_exam_paper(self.exam.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.written.question_text = 'Explain in detail.'
+            self.written.save()
+            # Another process rendered the old rows and caches them under the current version
+            cache.set(papers._paper_key(self.exam.id, papers._paper_version(self.exam.id)), stale)
+        response = self.client.get(f'/api/exams/{self.exam.id}/paper/')
+        self.assertIn('Explain in detail.', response.content.decode())
+
+
+class AnswerKeyCacheTest(ExamTestMixin, TestCase):
+    """Test the compiled answer-key cache."""
+
+    def test_key_is_compiled_once(self):
+        key = get_answer_key(self.exam)
+        self.assertEqual(key[self.questions[0].id].correct, frozenset({self.correct[0].id}))
+        self.assertEqual(key[self.written.id].question_type, 'short_answer')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_answer_key(self.exam), key)
+        self.assertEqual(app_queries(queries), [])
+
+    def test_question_missing_from_cached_key_is_loaded(self):
+        get_answer_key(self.exam)
+        # Added without signals, as if by a process whose invalidation was lost
+        question = Question.objects.bulk_create([Question(exam=self.exam, question_text='Q9', marks=3, order=9)])[0]
+        correct = Option.objects.create(question=question, option_text='Right', is_correct=True)
+        self.answer(self.students[0], question, [correct])
+        result = auto_grade_exam(self.exam, self.students[0])
+        self.assertEqual(result['total_marks_obtained'], 3)
+
+    def test_key_cached_before_commit_is_dropped_on_commit(self):
+        stale = get_answer_key(self.exam)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.wrong[0].is_correct = True
+            self.wrong[0].save()
+            # Another process reads the new version before the commit and caches the old rows under it
+            version = cache.get(answer_keys._version_key(self.exam.id))
+            cache.set(answer_keys._data_key(self.exam.id, version), stale)
+        key = get_answer_key(self.exam)
+        self.assertEqual(key[self.questions[0].id].correct, frozenset({self.correct[0].id, self.wrong[0].id}))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_fails_checks(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['exams.E001'])
+
+    def test_option_change_invalidates_key(self):
+        get_answer_key(self.exam)
+        option = self.wrong[0]
+        option.is_correct = True
+        option.save()
+        key = get_answer_key(self.exam)
+        self.assertEqual(key[self.questions[0].id].correct, frozenset({self.correct[0].id, option.id}))
+
+    def test_question_change_invalidates_key(self):
+        get_answer_key(self.exam)
+        self.written.marks = 8
+        self.written.save()
+        self.assertEqual(get_answer_key(self.exam)[self.written.id].marks, 8)
+        self.questions[2].delete()
+        self.assertNotIn(self.questions[2].id, get_answer_key(self.exam))
+
+
+class RegradeExamTest(ExamTestMixin, TestCase):
+    """Test whole-exam re-grading."""
+
+    def setUp(self):
+        for student in self.students:
+            self.answer(student, self.questions[0], [self.correct[0]])
+            self.answer(student, self.questions[1], [self.wrong[1]])
+            self.answer(student, self.written, text='Because.')
+        self.answer(self.students[0], self.questions[2], [self.correct[2], self.wrong[2]])
+        for student in self.students:
+            auto_grade_exam(self.exam, student)
+        self.graded = {
+            answer.id: (answer.is_correct, answer.marks_obtained) for answer in StudentAnswer.objects.all()
+        }
+
+    def test_matches_single_submission_grading(self):
+        summary = regrade_exam(self.exam)
+        self.assertEqual(summary['students'], 3)
+        regraded = {answer.id: (answer.is_correct, answer.marks_obtained) for answer in StudentAnswer.objects.all()}
+        self.assertEqual(regraded, self.graded)
+
+    def test_answer_key_fix_is_applied_to_everyone(self):
+        Option.objects.filter(id=self.wrong[1].id).update(is_correct=True)
+        Option.objects.filter(id=self.correct[1].id).update(is_correct=False)
+        call_command('regrade_exam', str(self.exam.id), stdout=StringIO())
+
+        results = AutoGradingResult.objects.filter(exam=self.exam).order_by('student__email')
+        self.assertEqual([result.total_marks_obtained for result in results], [6, 4, 4])
+        self.assertEqual([result.total_marks_possible for result in results], [11, 9, 9])
+        self.assertTrue(StudentAnswer.objects.get(student=self.students[1], question=self.questions[1]).is_correct)
+
+    def test_regrade_api_is_for_teachers(self):
+        client = APIClient()
+        client.force_authenticate(user=self.students[0])
+        response = client.post(f'/api/exams/{self.exam.id}/regrade/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        client.force_authenticate(user=self.teacher)
+        response = client.post(f'/api/exams/{self.exam.id}/regrade/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['answers'], 10)
+
+        client.force_authenticate(user=User.objects.create_user(
+            email='admin@example.com', username='admin', password='testpass123', role='admin'
+        ))
+        response = client.post(f'/api/exams/{self.exam.id}/regrade/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ImportQuestionsTest(ExamTestMixin, TestCase):
+    """Test bulk import of question banks."""
+
+    bank = [
+        {'question_text': 'Capital of France?', 'marks': 3, 'order': 20, 'options': [
+            {'option_text': 'Paris', 'is_correct': True}, {'option_text': 'Rome'},
+        ]},
+        {'question_text': 'Describe a graph.', 'question_type': 'long_answer', 'marks': 10, 'order': 21},
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher)
+
+    def test_upload_json_file(self):
+        get_answer_key(self.exam)
+        upload = SimpleUploadedFile('bank.json', json.dumps(self.bank).encode())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                f'/api/exams/{self.exam.id}/import-questions/', {'file': upload}, format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], {'questions': 2, 'options': 2})
+        # Exam lookup and one insert each for questions and options
+        self.assertLessEqual(len(app_queries(queries)), 3)
+
+        question = Question.objects.get(exam=self.exam, order=20)
+        self.assertEqual(question.marks, 3)
+        self.assertEqual(list(question.options.values_list('option_text', 'is_correct')), [('Paris', True), ('Rome', False)])
+        # Bulk inserts send no signals; the import drops the cached key itself
+        self.assertIn(question.id, get_answer_key(self.exam))
+
+    def test_invalid_question_rejects_whole_bank(self):
+        bank = self.bank + [{'question_text': 'No answer?', 'options': [{'option_text': 'A'}, {'option_text': 'B'}]}]
+        response = self.client.post(
+            f'/api/exams/{self.exam.id}/import-questions/', {'questions': bank}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['details'], ['Question 3: no option is marked correct.'])
+        self.assertEqual(Question.objects.filter(exam=self.exam).count(), 4)
+
+    def test_non_integer_option_order_is_reported(self):
+        bank = [{'question_text': 'Pick one.', 'options': [
+            {'option_text': 'A', 'is_correct': True, 'order': 'x'}, {'option_text': 'B'},
+        ]}]
+        response = self.client.post(
+            f'/api/exams/{self.exam.id}/import-questions/', {'questions': bank}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['details'], ['Question 1: option 1 order must be an integer.'])
+        self.assertEqual(Question.objects.filter(exam=self.exam).count(), 4)
+
+    def test_only_owner_can_import(self):
+        other = User.objects.create_user(
+            email='other@example.com', username='other', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.post(
+            f'/api/exams/{self.exam.id}/import-questions/', {'questions': self.bank}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.students[0])
+        response = self.client.post(
+            f'/api/exams/{self.exam.id}/import-questions/', {'questions': self.bank}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_admin_can_import(self):
+        self.client.force_authenticate(user=User.objects.create_user(
+            email='admin@example.com', username='admin', password='testpass123', role='admin'
+        ))
+        response = self.client.post(
+            f'/api/exams/{self.exam.id}/import-questions/', {'questions': self.bank}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_command_imports_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as bank:
+            writer = csv.writer(bank)
+            writer.writerow(['question_text', 'question_type', 'marks', 'order', 'options', 'correct'])
+            writer.writerow(['2 + 2?', 'mcq', '1', '30', '3|4|5', '2'])
+            writer.writerow(['Prove it.', 'long_answer', '5', '31', '', ''])
+        self.addCleanup(os.unlink, bank.name)
+        call_command('import_questions', str(self.exam.id), bank.name, stdout=StringIO())
+
+        question = Question.objects.get(exam=self.exam, order=30)
+        self.assertEqual(list(question.options.filter(is_correct=True).values_list('option_text', flat=True)), ['4'])
+        self.assertTrue(Question.objects.filter(exam=self.exam, order=31, question_type='long_answer').exists())
+
+    def test_json_is_read_in_chunks(self):
+        text = json.dumps(self.bank * 20)
+        original = imports.READ_SIZE
+        imports.READ_SIZE = 16
+        try:
+            self.assertEqual(list(imports.iter_json(io.StringIO(text))), self.bank * 20)
+            lines = '\n'.join(json.dumps(question) for question in self.bank)
+            self.assertEqual(list(imports.iter_json(io.StringIO(lines))), self.bank)
+        finally:
+            imports.READ_SIZE = original
+
+    def test_question_list_route_is_reachable(self):
+        response = self.client.get('/api/exams/questions/', {'exam_id': self.exam.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
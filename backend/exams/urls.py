@@ -6,8 +6,9 @@ from rest_framework.routers import DefaultRouter
 from .views import ExamViewSet, QuestionViewSet
 
 router = DefaultRouter()
-router.register(r'', ExamViewSet, basename='exam')
 router.register(r'questions', QuestionViewSet, basename='question')
+# Registered last so its detail route does not shadow the prefixes above
+router.register(r'', ExamViewSet, basename='exam')
 
 urlpatterns = [
     path('', include(router.urls)),
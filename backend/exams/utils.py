@@ -1,48 +1,137 @@
 """
 Exam utilities for auto-grading.
 """
-from .models import StudentAnswer, AutoGradingResult, Question
+from collections import defaultdict
+from django.db import transaction
+from .analytics import invalidate_exam_statistics
+from .answer_keys import get_answer_key, invalidate_answer_key
+from .models import StudentAnswer, AutoGradingResult, Question, Option
+
+
+def save_submission(exam, student, answers_data):
+    """
+    Store a student's submitted answers with a fixed number of queries.
+
+    Question ids are validated in one query and selected option ids in
+    another; unknown questions are skipped and options that do not belong to
+    the answered question are dropped. New answers and their selected options
+    are written with bulk inserts inside one transaction. Answers the student
+    already has (retakes) get the new text and selection when options are
+    given. Returns the number of answers stored.
+    """
+    submitted = {}
+    for answer_data in answers_data:
+        if not isinstance(answer_data, dict):
+            continue
+        question_id = _to_id(answer_data.get('question_id'))
+        if question_id is not None:
+            submitted[question_id] = answer_data
+    question_ids = set(Question.objects.filter(exam=exam, id__in=submitted).values_list('id', flat=True))
+    submitted = {question_id: data for question_id, data in submitted.items() if question_id in question_ids}
+
+    requested = {}
+    for question_id, data in submitted.items():
+        requested[question_id] = {_to_id(option_id) for option_id in data.get('selected_option_ids') or []} - {None}
+    option_question = dict(Option.objects.filter(
+        question_id__in=question_ids, id__in=set().union(*requested.values())
+    ).values_list('id', 'question_id')) if any(requested.values()) else {}
+    selected = {
+        question_id: [option_id for option_id in option_ids if option_question.get(option_id) == question_id]
+        for question_id, option_ids in requested.items()
+    }
+
+    through = StudentAnswer.selected_options.through
+    with transaction.atomic():
+        existing = {
+            answer.question_id: answer
+            for answer in StudentAnswer.objects.filter(exam=exam, student=student, question_id__in=question_ids)
+        }
+        answers = StudentAnswer.objects.bulk_create([
+            StudentAnswer(exam=exam, student=student, question_id=question_id, answer_text=data.get('answer_text', ''))
+            for question_id, data in submitted.items() if question_id not in existing
+        ])
+
+        # As before, an existing answer is only replaced when options are given.
+        resubmitted = [answer for question_id, answer in existing.items() if requested[question_id]]
+        if resubmitted:
+            for answer in resubmitted:
+                answer.answer_text = submitted[answer.question_id].get('answer_text', '')
+            StudentAnswer.objects.bulk_update(resubmitted, ['answer_text'])
+            through.objects.filter(studentanswer__in=resubmitted).delete()
+            answers += resubmitted
+
+        through.objects.bulk_create([
+            through(studentanswer_id=answer.id, option_id=option_id)
+            for answer in answers
+            for option_id in selected[answer.question_id]
+        ])
+
+    return len(submitted)
+
+
+def _to_id(value):
+    """``value`` as a database id, or None when it is not one."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def grade_answer(entry, selected):
+    """
+    ``(is_correct, marks_obtained)`` for an answer selecting ``selected``
+    option ids. An MCQ answer is correct when every correct option is
+    selected; short and long answers are left for manual grading.
+    """
+    if entry.question_type != 'mcq':
+        return None, None
+    if entry.correct <= selected:
+        return True, entry.marks
+    return False, 0
 
 
 def auto_grade_exam(exam, student):
     """
     Auto-grade an exam for a student.
     Returns grading result.
+
+    The answer key comes from the answer-key cache; the answers and all
+    selected options are loaded with a fixed number of queries and written
+    back with one bulk update, however many questions the exam has.
     """
-    student_answers = StudentAnswer.objects.filter(exam=exam, student=student)
+    key = get_answer_key(exam)
+    answers = list(StudentAnswer.objects.filter(exam=exam, student=student).only('id', 'question_id'))
+    selections = defaultdict(set)
+    for answer_id, option_id in StudentAnswer.selected_options.through.objects.filter(
+        studentanswer__exam=exam, studentanswer__student=student
+    ).values_list('studentanswer_id', 'option_id'):
+        selections[answer_id].add(option_id)
+
+    if any(answer.question_id not in key for answer in answers):
+        # The question was added after this key was cached; compile it afresh
+        invalidate_answer_key(exam.id)
+        key = get_answer_key(exam)
+
     total_marks_obtained = 0
     total_marks_possible = 0
-    
-    for answer in student_answers:
-        question = answer.question
-        total_marks_possible += question.marks
-        
-        if question.question_type == 'mcq':
-            # Check if selected options match correct options
-            correct_options = question.options.filter(is_correct=True)
-            selected_options = answer.selected_options.filter(is_correct=True)
-            
-            if correct_options.count() == selected_options.count() and \
-               set(correct_options.values_list('id', flat=True)) == set(selected_options.values_list('id', flat=True)):
-                answer.is_correct = True
-                answer.marks_obtained = question.marks
-                total_marks_obtained += question.marks
-            else:
-                answer.is_correct = False
-                answer.marks_obtained = 0
-        else:
-            # For short/long answer, mark as ungraded (needs manual grading)
-            answer.is_correct = None
-            answer.marks_obtained = None
-        
-        answer.save()
-    
+    for answer in answers:
+        entry = key[answer.question_id]
+        total_marks_possible += entry.marks
+        answer.is_correct, answer.marks_obtained = grade_answer(entry, selections[answer.id])
+        total_marks_obtained += answer.marks_obtained or 0
+    StudentAnswer.objects.bulk_update(answers, ['is_correct', 'marks_obtained'], batch_size=500)
+    invalidate_exam_statistics(exam.id)
+
+    return save_result(exam, student, total_marks_obtained, total_marks_possible)
+
+
+def save_result(exam, student, total_marks_obtained, total_marks_possible):
+    """Create or update the grading result of a student and return it as a dict."""
     # Calculate percentage
     percentage = (total_marks_obtained / total_marks_possible * 100) if total_marks_possible > 0 else 0
     is_passed = percentage >= exam.passing_marks
-    
-    # Create or update grading result
-    result, created = AutoGradingResult.objects.get_or_create(
+
+    AutoGradingResult.objects.update_or_create(
         exam=exam,
         student=student,
         defaults={
@@ -52,18 +141,10 @@ def auto_grade_exam(exam, student):
             'is_passed': is_passed,
         }
     )
-    
-    if not created:
-        result.total_marks_obtained = total_marks_obtained
-        result.total_marks_possible = total_marks_possible
-        result.percentage = percentage
-        result.is_passed = is_passed
-        result.save()
-    
+
     return {
         'total_marks_obtained': total_marks_obtained,
         'total_marks_possible': total_marks_possible,
         'percentage': float(percentage),
         'is_passed': is_passed,
     }
-
@@ -1,14 +1,29 @@
 """
 Views for exams app.
 """
+import gzip
+import io
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q, Sum
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from .models import Exam, Question, Option, StudentAnswer, AutoGradingResult
-from .serializers import ExamSerializer, QuestionSerializer, StudentAnswerSerializer, AutoGradingResultSerializer
-from .utils import auto_grade_exam
+from django.utils.cache import patch_vary_headers
+from .models import Exam, Question, Option, StudentAnswer, AutoGradingResult, SimilarityFlag
+from .serializers import (
+    ExamSerializer, QuestionSerializer, StudentAnswerSerializer, AutoGradingResultSerializer, SimilarityFlagSerializer
+)
+from .utils import auto_grade_exam, save_submission
+from .grading import regrade_exam
+from .papers import get_exam_paper
+from .analytics import get_exam_statistics
+from .exports import result_rows, stream_csv, stream_xlsx
+from .rankings import get_score_index
+from accounts.models import User
+from accounts.serializers import UserSerializer
+from .drafts import discard_draft, get_draft, merge_draft, save_draft
+from .imports import QuestionImportError, import_questions, read_question_bank
 
 
 class IsTeacherOrReadOnly(permissions.BasePermission):
@@ -37,7 +52,57 @@ class ExamViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(teacher=self.request.user)
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['get'])
+    def paper(self, request, pk=None):
+        """
+        Questions and options of an exam, without answers, as pre-rendered
+        JSON. Supports ``If-None-Match``; the body is sent gzip-encoded to
+        clients that accept it.
+        """
+        exam = self.get_object()
+        if request.user.is_student and timezone.now() < exam.start_time:
+            return Response({'error': 'Exam has not started yet.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        body, etag = get_exam_paper(exam.id)
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(body, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(body), content_type='application/json')
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+    
+    @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.IsAuthenticated])
+    def autosave(self, request, pk=None):
+        """
+        Autosave answers of an exam in progress (student only).
+        
+        POST merges ``answers`` into the student's draft, GET returns the
+        draft. Drafts become answers only when the exam is submitted or,
+        after it ends, by ``flush_exam_drafts``.
+        """
+        if not request.user.is_student:
+            return Response({'error': 'Only students can autosave exams.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        exam = self.get_object()
+        
+        if request.method == 'GET':
+            return Response({'answers': list(get_draft(exam.id, request.user.id).values())})
+        
+        if not exam.is_active:
+            return Response({'error': 'Exam is not in progress.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        answers_data = request.data.get('answers', [])
+        if not isinstance(answers_data, list):
+            return Response({'error': 'answers must be a list.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        saved = save_draft(exam, request.user.id, answers_data)
+        return Response({'saved': saved, 'saved_at': timezone.now()})
+    
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def submit(self, request, pk=None):
         """Submit exam answers (student only)."""
         if not request.user.is_student:
@@ -59,31 +124,12 @@ class ExamViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Exam already submitted.'}, status=status.HTTP_400_BAD_REQUEST)
         
         answers_data = request.data.get('answers', [])
+        if not isinstance(answers_data, list):
+            return Response({'error': 'answers must be a list.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Save answers
-        for answer_data in answers_data:
-            question_id = answer_data.get('question_id')
-            answer_text = answer_data.get('answer_text', '')
-            selected_option_ids = answer_data.get('selected_option_ids', [])
-            
-            try:
-                question = Question.objects.get(id=question_id, exam=exam)
-            except Question.DoesNotExist:
-                continue
-            
-            student_answer, created = StudentAnswer.objects.get_or_create(
-                exam=exam,
-                student=request.user,
-                question=question,
-                defaults={
-                    'answer_text': answer_text,
-                }
-            )
-            
-            if selected_option_ids:
-                student_answer.selected_options.set(selected_option_ids)
-                student_answer.answer_text = answer_text
-                student_answer.save()
+        # Save answers, including autosaved ones the submission leaves out
+        save_submission(exam, request.user, merge_draft(exam.id, request.user.id, answers_data))
+        discard_draft(exam.id, request.user.id)
         
         # Auto-grade
         result = auto_grade_exam(exam, request.user)
@@ -95,21 +141,171 @@ class ExamViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def results(self, request, pk=None):
-        """Get exam results."""
+        """
+        Get exam results.
+        
+        Students also get their rank and percentile; teachers can ask for the
+        ``top`` N results instead of the full list.
+        """
         exam = self.get_object()
         
         if request.user.is_student:
             # Student can only see their own results
             result = AutoGradingResult.objects.filter(exam=exam, student=request.user).first()
             if result:
-                return Response(AutoGradingResultSerializer(result).data)
+                data = AutoGradingResultSerializer(result).data
+                data.update(get_score_index(exam.id).standing(result.percentage))
+                return Response(data)
             return Response({'message': 'Results not available yet.'}, status=status.HTTP_404_NOT_FOUND)
         elif request.user.is_teacher or request.user.is_admin:
             # Teacher/admin can see all results
+            if request.query_params.get('top'):
+                try:
+                    top = int(request.query_params['top'])
+                except ValueError:
+                    return Response({'error': 'top must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+                index = get_score_index(exam.id)
+                leaders = index.top(max(top, 0))
+                students = User.objects.in_bulk([student_id for student_id, _, _ in leaders])
+                percentiles = index.percentiles([score for _, score, _ in leaders])
+                return Response({
+                    'out_of': len(index),
+                    'top': [
+                        {
+                            'rank': rank,
+                            'percentage': score,
+                            'percentile': percentiles[score],
+                            'student': UserSerializer(students[student_id]).data if student_id in students else None,
+                        }
+                        for student_id, score, rank in leaders
+                    ],
+                })
             results = AutoGradingResult.objects.filter(exam=exam)
             return Response(AutoGradingResultSerializer(results, many=True).data)
         
         return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+    
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Stream exam results as CSV, or XLSX with ``file_format=xlsx``
+        (teacher/admin only). ``questions=true`` adds per-question marks.
+        """
+        if not (request.user.is_teacher or request.user.is_admin):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        exam = self.get_object()
+        file_format = request.query_params.get('file_format', 'csv')
+        per_question = request.query_params.get('questions', '').lower() in ('1', 'true', 'yes')
+        rows = result_rows(exam, per_question=per_question)
+        
+        if file_format == 'csv':
+            response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+        elif file_format == 'xlsx':
+            try:
+                content = stream_xlsx(rows)
+            except RuntimeError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            response = StreamingHttpResponse(
+                content, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        else:
+            return Response({'error': 'file_format must be csv or xlsx.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        response['Content-Disposition'] = f'attachment; filename="exam-{exam.id}-results.{file_format}"'
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Item analysis and score distribution of an exam (teacher/admin only)."""
+        if not (request.user.is_teacher or request.user.is_admin):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        exam = self.get_object()
+        return Response(get_exam_statistics(exam))
+    
+    @action(detail=True, methods=['get', 'patch'], url_path='similar-answers',
+            permission_classes=[permissions.IsAuthenticated])
+    def similar_answers(self, request, pk=None):
+        """
+        Near-duplicate written answers flagged by ``detect_similar_answers``
+        (teacher/admin only). PATCH with ``flag_id`` and ``is_reviewed``
+        marks a pair as reviewed.
+        """
+        if not (request.user.is_teacher or request.user.is_admin):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        exam = self.get_object()
+        flags = SimilarityFlag.objects.filter(exam=exam).select_related(
+            'first_answer__student', 'second_answer__student'
+        )
+        
+        if request.method == 'PATCH':
+            try:
+                flag_id = int(request.data.get('flag_id'))
+            except (TypeError, ValueError):
+                return Response({'error': 'flag_id must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+            flag = flags.filter(id=flag_id).first()
+            if flag is None:
+                return Response({'error': 'Flag not found.'}, status=status.HTTP_404_NOT_FOUND)
+            flag.is_reviewed = str(request.data.get('is_reviewed', True)).lower() not in ('false', '0')
+            flag.save(update_fields=['is_reviewed'])
+            return Response(SimilarityFlagSerializer(flag).data)
+        
+        if request.query_params.get('include_reviewed', '').lower() not in ('1', 'true'):
+            flags = flags.filter(is_reviewed=False)
+        return Response({
+            'checked_at': exam.similarity_checked_at,
+            'flags': SimilarityFlagSerializer(flags, many=True).data,
+        })
+    
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def regrade(self, request, pk=None):
+        """Re-grade every submission after the answer key changed (teacher/admin only)."""
+        if not (request.user.is_teacher or request.user.is_admin):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        exam = self.get_object()
+        summary = regrade_exam(exam)
+        
+        return Response({
+            'message': 'Exam re-graded successfully.',
+            'summary': summary
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'], url_path='import-questions',
+            permission_classes=[permissions.IsAuthenticated])
+    def import_questions(self, request, pk=None):
+        """
+        Bulk-create questions and options from an uploaded ``file`` (JSON or
+        CSV; ``file_format`` defaults to the file extension) or a JSON body
+        with a ``questions`` list. Nothing is saved unless every question is
+        valid.
+        """
+        exam = self.get_object()
+        if not (exam.teacher_id == request.user.id or request.user.is_admin):
+            return Response({'error': 'You can only add questions to your own exams.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1]
+                stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                try:
+                    created = import_questions(exam, read_question_bank(stream, file_format))
+                finally:
+                    stream.detach()
+            elif isinstance(request.data.get('questions'), list):
+                created = import_questions(exam, request.data['questions'])
+            else:
+                return Response({'error': 'Upload a file or send a questions list.'}, status=status.HTTP_400_BAD_REQUEST)
+        except QuestionImportError as e:
+            return Response({'error': 'Import failed.', 'details': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': 'Questions imported successfully.',
+            'created': created
+        }, status=status.HTTP_201_CREATED)
 
 
 class QuestionViewSet(viewsets.ModelViewSet):
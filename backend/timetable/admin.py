@@ -2,7 +2,7 @@
 Admin for timetable app.
 """
 from django.contrib import admin
-from .models import Room, TimeSlot, Timetable, ScheduleGenerationLog
+from .models import Room, TimeSlot, Timetable, TimetableVersion, PublishedTimetable, ScheduleGenerationLog
 
 
 @admin.register(Room)
@@ -17,17 +17,30 @@ class TimeSlotAdmin(admin.ModelAdmin):
     list_filter = ('day',)
 
 
+@admin.register(TimetableVersion)
+class TimetableVersionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'semester', 'academic_year', 'note', 'created_by', 'created_at', 'published_at')
+    list_filter = ('semester', 'academic_year')
+    readonly_fields = ('created_at', 'published_at')
+
+
+@admin.register(PublishedTimetable)
+class PublishedTimetableAdmin(admin.ModelAdmin):
+    list_display = ('semester', 'academic_year', 'version', 'published_by', 'published_at')
+    readonly_fields = ('published_at',)
+
+
 @admin.register(Timetable)
 class TimetableAdmin(admin.ModelAdmin):
-    list_display = ('course', 'teacher', 'room', 'time_slot', 'semester', 'academic_year')
-    list_filter = ('semester', 'academic_year', 'time_slot__day', 'course__department')
+    list_display = ('course', 'teacher', 'room', 'time_slot', 'semester', 'academic_year', 'version')
+    list_filter = ('semester', 'academic_year', 'version', 'time_slot__day', 'course__department')
     search_fields = ('course__code', 'teacher__email', 'room__name')
     readonly_fields = ('created_at',)
 
 
 @admin.register(ScheduleGenerationLog)
 class ScheduleGenerationLogAdmin(admin.ModelAdmin):
-    list_display = ('generated_by', 'status', 'courses_scheduled', 'conflicts_found', 'generated_at')
+    list_display = ('generated_by', 'semester', 'academic_year', 'status', 'progress', 'courses_scheduled', 'conflicts_found', 'generated_at')
     list_filter = ('status', 'generated_at')
-    readonly_fields = ('generated_at',)
+    readonly_fields = ('generated_at', 'started_at', 'finished_at')
 
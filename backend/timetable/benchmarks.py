@@ -0,0 +1,112 @@
+"""
+Synthetic campuses and measurements for benchmarking timetable generation.
+
+Used by the ``benchmark_timetable`` management command and the pytest
+benchmark cases in ``timetable/test_benchmarks.py``.
+"""
+import random
+import time
+import tracemalloc
+from datetime import time as clock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from accounts.models import User, Department, Course
+from .models import Room, TimeSlot
+from .utils import generate_timetable
+
+
+BENCHMARK_SEMESTER = 99
+BENCHMARK_ACADEMIC_YEAR = 'benchmark'
+
+
+def build_synthetic_campus(courses=50, rooms=10, days=5, slots_per_day=6, students=500,
+                           enrollment_density=0.05, teachers=None, seed=0, prefix='bench'):
+    """
+    Create a synthetic campus with bulk inserts and return its size.
+
+    Every student enrolls in ``enrollment_density`` of the courses (at least
+    one), chosen at random; room capacities are spread so that most but not
+    all rooms fit the largest courses. The same ``seed`` builds the same
+    campus.
+    """
+    rng = random.Random(seed)
+    teachers = teachers or max(1, courses // 2)
+
+    department, _ = Department.objects.get_or_create(
+        code=prefix[:10].upper(), defaults={'name': f'Benchmark {prefix}'}
+    )
+    teacher_users = User.objects.bulk_create([
+        User(email=f'{prefix}-teacher{i}@example.com', username=f'{prefix}-teacher{i}', role='teacher', password='!')
+        for i in range(teachers)
+    ])
+    student_users = User.objects.bulk_create([
+        User(email=f'{prefix}-student{i}@example.com', username=f'{prefix}-student{i}', role='student', password='!')
+        for i in range(students)
+    ])
+    course_rows = Course.objects.bulk_create([
+        Course(name=f'Course {i}', code=f'{prefix}{i:05d}', department=department, teacher=rng.choice(teacher_users))
+        for i in range(courses)
+    ])
+
+    per_student = max(1, round(enrollment_density * courses))
+    enrollments = [
+        Course.students.through(course_id=course.id, user_id=student.id)
+        for student in student_users
+        for course in rng.sample(course_rows, min(per_student, courses))
+    ]
+    Course.students.through.objects.bulk_create(enrollments, batch_size=5000)
+
+    largest = max(1, round(students * per_student / courses * 1.5))
+    Room.objects.bulk_create([
+        Room(name=f'{prefix}-R{i}', capacity=rng.randint(largest // 2, largest * 2), building='Benchmark')
+        for i in range(rooms)
+    ])
+
+    day_names = [day for day, _ in TimeSlot.DAY_CHOICES][:days]
+    TimeSlot.objects.bulk_create([
+        TimeSlot(day=day, start_time=clock(8 + hour, 0), end_time=clock(8 + hour, 50))
+        for day in day_names
+        for hour in range(slots_per_day)
+    ], ignore_conflicts=True)
+
+    return {
+        'courses': courses,
+        'rooms': rooms,
+        'time_slots': days * slots_per_day,
+        'students': students,
+        'teachers': teachers,
+        'enrollments': len(enrollments),
+    }
+
+
+def measure_generation(search_options=None):
+    """
+    Run the generator once and report wall time, query count, peak Python
+    memory and how much of the campus got scheduled.
+    """
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = generate_timetable(BENCHMARK_SEMESTER, BENCHMARK_ACADEMIC_YEAR, None, search_options=search_options)
+            elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = Course.objects.filter(students__isnull=False).distinct().count()
+    return {
+        'status': result['status'],
+        'wall_time': elapsed,
+        'queries': sum(1 for query in queries.captured_queries if not _is_savepoint(query['sql'])),
+        'peak_memory_kb': peak // 1024,
+        'courses_scheduled': result['courses_scheduled'],
+        'courses_total': total,
+        'courses_unscheduled': total - result['courses_scheduled'],
+        'scheduled_ratio': result['courses_scheduled'] / total if total else 0,
+    }
+
+
+def _is_savepoint(sql):
+    """Savepoint statements depend on the surrounding transaction, not on the work done."""
+    return sql.lstrip().upper().startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
@@ -0,0 +1,50 @@
+"""
+Course conflict graph.
+
+Two courses conflict when they share enrolled students. The graph is built in
+one pass over the enrollment table, grouped by student, and stored as sparse
+adjacency with the number of shared students as edge weight, so the
+scheduler never has to intersect ``Course.students`` sets pairwise.
+"""
+from itertools import combinations, groupby
+from accounts.models import Course
+
+
+class CourseConflictGraph:
+    """Sparse weighted adjacency between courses that share students."""
+
+    def __init__(self, adjacency=None):
+        self.adjacency = adjacency or {}
+
+    @classmethod
+    def load(cls):
+        """Build the graph with a single streamed query over enrollments."""
+        enrollments = Course.students.through.objects.order_by('user_id', 'course_id').values_list('user_id', 'course_id')
+        return cls.from_enrollments(enrollments.iterator(chunk_size=5000))
+
+    @classmethod
+    def from_enrollments(cls, enrollments):
+        """Build the graph from ``(student_id, course_id)`` pairs sorted by student."""
+        adjacency = {}
+        for _, rows in groupby(enrollments, key=lambda row: row[0]):
+            for first, second in combinations(sorted({course_id for _, course_id in rows}), 2):
+                first_edges = adjacency.setdefault(first, {})
+                first_edges[second] = first_edges.get(second, 0) + 1
+                second_edges = adjacency.setdefault(second, {})
+                second_edges[first] = second_edges.get(first, 0) + 1
+        return cls(adjacency)
+
+    def neighbours(self, course_id):
+        """Mapping of conflicting course id -> number of shared students."""
+        return self.adjacency.get(course_id, {})
+
+    def weight(self, course_id, other_id):
+        return self.neighbours(course_id).get(other_id, 0)
+
+    def degree(self, course_id):
+        """Total number of shared-student links of a course."""
+        return sum(self.neighbours(course_id).values())
+
+    @property
+    def edge_count(self):
+        return sum(len(edges) for edges in self.adjacency.values()) // 2
@@ -0,0 +1,125 @@
+"""
+Background timetable generation jobs.
+
+Jobs are ``ScheduleGenerationLog`` rows: the API enqueues a ``queued`` row and
+returns its id, and the ``process_timetable_jobs`` management command claims
+and runs queued rows, recording progress and phase timings on the row so that
+clients can poll it.
+"""
+import time
+from django.utils import timezone
+from .models import ScheduleGenerationLog
+from .utils import generate_timetable, regenerate_timetable
+
+
+# Share of the overall progress bar covered by each phase.
+PHASE_RANGES = {
+    'loading': (0, 10),
+    'solving': (10, 90),
+    'writing': (90, 100),
+}
+
+
+def enqueue_generation(user, semester, academic_year, options=None):
+    """Queue a generation job and return its log row."""
+    return ScheduleGenerationLog.objects.create(
+        generated_by=user,
+        status='queued',
+        semester=semester,
+        academic_year=academic_year,
+        options=options or {}
+    )
+
+
+def claim_next_job():
+    """
+    Atomically claim the oldest queued job, or return None.
+
+    The claim is a conditional UPDATE, so several workers can poll the same
+    queue without running a job twice.
+    """
+    queued = ScheduleGenerationLog.objects.filter(status='queued').order_by('generated_at', 'id')
+    for job_id in queued.values_list('id', flat=True)[:10]:
+        claimed = ScheduleGenerationLog.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return ScheduleGenerationLog.objects.get(id=job_id)
+    return None
+
+
+class JobProgress:
+    """Progress callback that writes phase, percent and timings to a job row."""
+
+    def __init__(self, log, step=5):
+        self.log = log
+        self.step = step
+        self._phase = None
+        self._phase_started = None
+
+    def __call__(self, phase, fraction):
+        now = time.monotonic()
+        low, high = PHASE_RANGES.get(phase, (self.log.progress, self.log.progress))
+        percent = int(low + (high - low) * fraction)
+        if phase != self._phase:
+            self._close_phase(now)
+            self._phase = phase
+            self._phase_started = now
+        elif percent < self.log.progress + self.step:
+            return
+        self.log.phase = phase
+        self.log.progress = percent
+        self.log.save(update_fields=['phase', 'progress', 'phase_timings'])
+
+    def finish(self):
+        self._close_phase(time.monotonic())
+        self._phase = None
+
+    def _close_phase(self, now):
+        if self._phase is not None:
+            self.log.phase_timings[self._phase] = round(now - self._phase_started, 4)
+
+
+def run_job(log):
+    """Run a claimed job to completion, recording the outcome on its row."""
+    progress = JobProgress(log)
+    options = log.options or {}
+    try:
+        if options.get('incremental'):
+            result = regenerate_timetable(
+                log.semester,
+                log.academic_year,
+                log.generated_by,
+                course_ids=options.get('course_ids', []),
+                room_ids=options.get('room_ids', []),
+                time_slot_ids=options.get('time_slot_ids', []),
+                search_options=options.get('search'),
+                progress=progress,
+                publish=options.get('publish', True)
+            )
+        else:
+            result = generate_timetable(
+                log.semester,
+                log.academic_year,
+                log.generated_by,
+                search_options=options.get('search'),
+                progress=progress,
+                publish=options.get('publish', True)
+            )
+    except Exception as e:
+        progress.finish()
+        log.status = 'failed'
+        log.error_message = str(e)
+    else:
+        progress.finish()
+        log.status = result['status']
+        log.courses_scheduled = result['courses_scheduled']
+        log.conflicts_found = result['conflicts_found']
+        log.conflicts_resolved = result['conflicts_resolved']
+        log.error_message = result.get('error_message', '')
+        log.result = result
+        log.progress = 100
+    log.phase = 'done'
+    log.finished_at = timezone.now()
+    log.save()
+    return log
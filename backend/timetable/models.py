@@ -45,8 +45,60 @@ class TimeSlot(models.Model):
         return f"{self.get_day_display()} {self.start_time} - {self.end_time}"
 
 
+class TimetableVersion(models.Model):
+    """
+    One complete timetable of a semester.
+    
+    Generation writes into a new (draft) version; publishing points the
+    semester's ``PublishedTimetable`` at it, so readers switch over in one
+    step and older versions remain available for rollback.
+    """
+    semester = models.IntegerField(default=1)
+    academic_year = models.CharField(max_length=20, default='2024-2025')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='timetable_versions')
+    base = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='drafts', help_text="Published version an incremental draft was derived from")
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)  # last time it was published
+    
+    class Meta:
+        db_table = 'timetable_versions'
+        indexes = [
+            models.Index(fields=['semester', 'academic_year']),
+        ]
+        ordering = ['-created_at', '-id']
+    
+    def __str__(self):
+        return f"Timetable v{self.id} - Semester {self.semester} {self.academic_year}"
+
+
+class PublishedTimetable(models.Model):
+    """Pointer to the published version of a semester's timetable."""
+    semester = models.IntegerField(default=1)
+    academic_year = models.CharField(max_length=20, default='2024-2025')
+    version = models.ForeignKey(TimetableVersion, on_delete=models.PROTECT, related_name='publications')
+    published_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='published_timetables')
+    published_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'published_timetables'
+        unique_together = ['semester', 'academic_year']
+    
+    def __str__(self):
+        return f"Semester {self.semester} {self.academic_year} -> v{self.version_id}"
+
+
+class TimetableQuerySet(models.QuerySet):
+    """Queries over timetable entries."""
+    
+    def published(self):
+        """Entries belonging to the published version of their semester."""
+        return self.filter(version__in=PublishedTimetable.objects.values('version'))
+
+
 class Timetable(models.Model):
     """Timetable entry model."""
+    version = models.ForeignKey(TimetableVersion, on_delete=models.CASCADE, null=True, blank=True, related_name='entries')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='timetable_entries')
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timetable_entries', limit_choices_to={'role': 'teacher'})
     room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True, related_name='timetable_entries')
@@ -55,9 +107,12 @@ class Timetable(models.Model):
     academic_year = models.CharField(max_length=20, default='2024-2025')
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = TimetableQuerySet.as_manager()
+    
     class Meta:
         db_table = 'timetable'
         indexes = [
+            models.Index(fields=['version', 'semester', 'academic_year']),
             models.Index(fields=['course', 'semester']),
             models.Index(fields=['teacher']),
             models.Index(fields=['room', 'time_slot']),
@@ -69,23 +124,44 @@ class Timetable(models.Model):
 
 
 class ScheduleGenerationLog(models.Model):
-    """Log for timetable generation attempts."""
-    generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='schedule_generations', limit_choices_to={'role': 'admin'})
-    status = models.CharField(max_length=20, choices=[
+    """
+    Log for timetable generation attempts.
+    
+    Doubles as the queue of background generation jobs: a job is created
+    ``queued``, claimed by the ``process_timetable_jobs`` worker, and reports
+    its progress here until it finishes.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
         ('success', 'Success'),
         ('failed', 'Failed'),
         ('partial', 'Partial'),
-    ])
+    ]
+    
+    generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='schedule_generations', limit_choices_to={'role': 'admin'})
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    semester = models.IntegerField(default=1)
+    academic_year = models.CharField(max_length=20, default='2024-2025')
+    options = models.JSONField(default=dict, blank=True)  # e.g. {"incremental": true, "course_ids": [...]}
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    phase = models.CharField(max_length=20, blank=True)
+    phase_timings = models.JSONField(default=dict, blank=True)  # phase -> seconds
+    result = models.JSONField(null=True, blank=True)
     courses_scheduled = models.IntegerField(default=0)
     conflicts_found = models.IntegerField(default=0)
     conflicts_resolved = models.IntegerField(default=0)
     error_message = models.TextField(blank=True)
     generated_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'schedule_generation_logs'
+        indexes = [
+            models.Index(fields=['status', 'generated_at']),
+        ]
         ordering = ['-generated_at']
     
     def __str__(self):
         return f"Schedule Generation - {self.status} - {self.generated_at}"
-
@@ -0,0 +1,122 @@
+"""
+Occupancy index for timetable conflict checks.
+
+Teacher and room occupancy are kept as integer bitsets: every room gets a bit
+in a per-slot "busy rooms" mask, and every teacher gets a mask with one bit
+per time slot. Rooms are numbered in ascending capacity, so the rooms that
+can seat at least N students are a contiguous run of high bits and "free rooms
+with capacity >= N in slot S" is a couple of integer operations. Courses that
+share students with a booked course get the booked slot set in a per-course
+"student clash" mask.
+"""
+from bisect import bisect_left
+from .models import Room, TimeSlot, Timetable
+
+
+class OccupancyIndex:
+    """Teacher and room bookings per time slot, backed by integer bitsets."""
+
+    def __init__(self, rooms, time_slots):
+        # ``rooms`` and ``time_slots`` are any objects with ``id`` (and, for
+        # rooms, ``capacity`` and ``name``) attributes.
+        self.rooms = sorted(rooms, key=lambda room: (room.capacity, room.name))
+        self.room_bits = {room.id: bit for bit, room in enumerate(self.rooms)}
+        self.slot_bits = {slot.id: bit for bit, slot in enumerate(time_slots)}
+        self._capacities = [room.capacity for room in self.rooms]
+        self._all_rooms = (1 << len(self.rooms)) - 1
+        self._room_busy = [0] * len(self.slot_bits)
+        self._teacher_busy = {}
+        self._clash_slots = {}
+        self._clash_counts = {}
+
+    @classmethod
+    def load(cls, semester, academic_year, exclude_id=None, version=None):
+        """
+        Build an index of the bookings already stored for a semester.
+
+        Bookings come from ``version`` if given, else from the published
+        version. Costs three queries however many checks are made against it.
+        """
+        rooms = Room.objects.only('id', 'name', 'capacity')
+        time_slots = TimeSlot.objects.only('id')
+        index = cls(rooms, time_slots)
+        entries = Timetable.objects.published() if version is None else Timetable.objects.filter(version=version)
+        entries = entries.filter(semester=semester, academic_year=academic_year)
+        if exclude_id is not None:
+            entries = entries.exclude(id=exclude_id)
+        for teacher_id, room_id, slot_id in entries.values_list('teacher_id', 'room_id', 'time_slot_id'):
+            index.book(teacher_id, room_id, slot_id)
+        return index
+
+    def copy(self):
+        """Independent copy of the index, sharing only the immutable room data."""
+        clone = object.__new__(OccupancyIndex)
+        clone.__dict__.update(self.__dict__)
+        clone._room_busy = list(self._room_busy)
+        clone._teacher_busy = dict(self._teacher_busy)
+        clone._clash_slots = dict(self._clash_slots)
+        clone._clash_counts = dict(self._clash_counts)
+        return clone
+
+    def rooms_with_capacity(self, min_capacity):
+        """Bitmask of rooms seating at least ``min_capacity``."""
+        return self._all_rooms & ~((1 << bisect_left(self._capacities, min_capacity)) - 1)
+
+    def free_rooms(self, slot_id, min_capacity=0):
+        """Bitmask of rooms free in a slot and seating at least ``min_capacity``."""
+        return ~self._room_busy[self.slot_bits[slot_id]] & self.rooms_with_capacity(min_capacity)
+
+    def first_free_room(self, slot_id, min_capacity=0):
+        """Smallest room free in a slot that seats ``min_capacity``, or None."""
+        mask = self.free_rooms(slot_id, min_capacity)
+        if not mask:
+            return None
+        return self.rooms[(mask & -mask).bit_length() - 1]
+
+    def free_room_ids(self, slot_id, min_capacity=0):
+        """Ids of the free rooms in a slot, smallest first."""
+        mask = self.free_rooms(slot_id, min_capacity)
+        return [room.id for bit, room in enumerate(self.rooms) if mask >> bit & 1]
+
+    def is_room_free(self, room_id, slot_id):
+        return not self._room_busy[self.slot_bits[slot_id]] >> self.room_bits[room_id] & 1
+
+    def teacher_slots(self, teacher_id):
+        """Bitmask of slots in which a teacher is already booked."""
+        return self._teacher_busy.get(teacher_id, 0)
+
+    def is_teacher_free(self, teacher_id, slot_id):
+        return not self.teacher_slots(teacher_id) >> self.slot_bits[slot_id] & 1
+
+    def has_student_clash(self, course_id, slot_id):
+        """Whether a course shares students with a course booked in the slot."""
+        return bool(self._clash_slots.get(course_id, 0) >> self.slot_bits[slot_id] & 1)
+
+    def book(self, teacher_id, room_id, slot_id, conflicting_courses=()):
+        """
+        Mark a teacher and room (which may be None) busy in a slot.
+
+        ``conflicting_courses`` are the ids of courses sharing students with
+        the booked course; the slot is marked as a clash for each of them.
+        """
+        slot_bit = self.slot_bits[slot_id]
+        self._teacher_busy[teacher_id] = self.teacher_slots(teacher_id) | (1 << slot_bit)
+        if room_id is not None:
+            self._room_busy[slot_bit] |= 1 << self.room_bits[room_id]
+        for course_id in conflicting_courses:
+            key = (course_id, slot_bit)
+            self._clash_counts[key] = self._clash_counts.get(key, 0) + 1
+            self._clash_slots[course_id] = self._clash_slots.get(course_id, 0) | (1 << slot_bit)
+
+    def release(self, teacher_id, room_id, slot_id, conflicting_courses=()):
+        """Undo a booking made with ``book``."""
+        slot_bit = self.slot_bits[slot_id]
+        self._teacher_busy[teacher_id] = self.teacher_slots(teacher_id) & ~(1 << slot_bit)
+        if room_id is not None:
+            self._room_busy[slot_bit] &= ~(1 << self.room_bits[room_id])
+        for course_id in conflicting_courses:
+            key = (course_id, slot_bit)
+            self._clash_counts[key] -= 1
+            if not self._clash_counts[key]:
+                del self._clash_counts[key]
+                self._clash_slots[course_id] &= ~(1 << slot_bit)
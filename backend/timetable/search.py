@@ -0,0 +1,150 @@
+"""
+Multi-start timetable search.
+
+The greedy solver is sensitive to the order in which courses are placed. The
+search runs it from many heuristic and randomized orderings in a process pool
+over the same in-memory snapshot, keeps the best result and stops when every
+course is placed or the time budget runs out.
+"""
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from .solver import solve
+
+
+HEURISTICS = ('given', 'largest_degree', 'most_constrained', 'largest_enrollment')
+
+# State installed in each worker process by ``_init_worker``.
+_worker_state = {}
+
+
+def course_order(snapshot, course_ids, heuristic, seed=None):
+    """
+    Order ``course_ids`` for placement.
+
+    ``largest_degree`` places courses sharing the most students with other
+    courses first (Welsh-Powell colouring order); ``most_constrained`` places
+    courses with the fewest rooms large enough, the most weekly sessions, the
+    busiest teachers and the most student conflicts first; ``largest_enrollment`` places big courses
+    first; ``random`` shuffles with ``seed``. Heuristic orders are broken by
+    ``seed`` too, so repeated starts explore different tie orders.
+    """
+    rng = random.Random(seed)
+    courses = [snapshot.courses_by_id[course_id] for course_id in course_ids]
+    tie_break = {course.id: rng.random() if seed is not None else 0 for course in courses}
+
+    if heuristic == 'random':
+        rng.shuffle(courses)
+    elif heuristic == 'largest_degree':
+        courses.sort(key=lambda course: (-snapshot.conflicts.degree(course.id), tie_break[course.id]))
+    elif heuristic == 'largest_enrollment':
+        courses.sort(key=lambda course: (-course.enrollment, tie_break[course.id]))
+    elif heuristic == 'most_constrained':
+        capacities = sorted(room.capacity for room in snapshot.rooms)
+        teacher_load = Counter(course.teacher_id for course in courses)
+        courses.sort(key=lambda course: (
+            sum(1 for capacity in capacities if capacity >= course.enrollment),
+            -course.sessions,
+            -teacher_load[course.teacher_id],
+            -snapshot.conflicts.degree(course.id),
+            tie_break[course.id],
+        ))
+    return [course.id for course in courses]
+
+
+def score(result):
+    """Higher is better: most fully scheduled courses, then most sessions, then fewest conflicts."""
+    return (-len(result.unscheduled), len(result.placements), -result.conflicts_found)
+
+
+def _init_worker(snapshot, course_ids, index, placed):
+    _worker_state.update(snapshot=snapshot, course_ids=course_ids, index=index, placed=placed)
+
+
+def _run_start(heuristic, seed):
+    snapshot = _worker_state['snapshot']
+    index = _worker_state['index']
+    order = course_order(snapshot, _worker_state['course_ids'], heuristic, seed)
+    result = solve(snapshot, order=order, index=index.copy() if index else None, placed=_worker_state['placed'])
+    return heuristic, seed, result
+
+
+def _starts():
+    """Deterministic starts first, then randomized variations forever."""
+    for heuristic in HEURISTICS:
+        yield heuristic, None
+    seed = 0
+    while True:
+        for heuristic in ('largest_degree', 'most_constrained', 'largest_enrollment', 'random'):
+            seed += 1
+            yield heuristic, seed
+
+
+def search(snapshot, course_ids=None, index=None, placed=None, time_budget=10.0, workers=None, max_starts=None,
+           progress=None):
+    """
+    Run the solver from many orderings and return ``(best_result, stats)``.
+
+    ``course_ids``, ``index`` and ``placed`` have the same meaning as
+    ``order``, ``index`` and ``placed`` in ``solver.solve``. Starts run in a
+    process pool of ``workers`` processes (default: all cores); with one
+    worker, or where processes cannot be forked, they run in this process.
+    """
+    if course_ids is None:
+        course_ids = [course.id for course in snapshot.courses]
+    workers = workers or os.cpu_count() or 1
+    deadline = time.monotonic() + time_budget
+    starts = _starts()
+    best = None
+    stats = {'starts': 0, 'workers': workers, 'best_heuristic': None, 'best_seed': None}
+
+    def consider(heuristic, seed, result):
+        nonlocal best
+        stats['starts'] += 1
+        if best is None or score(result) > score(best):
+            best = result
+            stats['best_heuristic'], stats['best_seed'] = heuristic, seed
+        if progress:
+            progress(min(1.0, 1 - (deadline - time.monotonic()) / time_budget) if time_budget > 0 else 1.0)
+
+    def finished():
+        return (
+            not best.unscheduled
+            or time.monotonic() >= deadline
+            or (max_starts is not None and stats['starts'] >= max_starts)
+        )
+
+    if workers == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        _init_worker(snapshot, course_ids, index, placed)
+        while best is None or not finished():
+            consider(*_run_start(*next(starts)))
+    else:
+        # Forked workers inherit the loaded Django apps and never touch the
+        # database; the snapshot is shipped to each worker once.
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(snapshot, course_ids, index, placed),
+        )
+        try:
+            pending = set()
+            submitted = 0
+            while True:
+                while len(pending) < workers * 2 and (max_starts is None or submitted < max_starts):
+                    pending.add(executor.submit(_run_start, *next(starts)))
+                    submitted += 1
+                # Always wait for at least one result, however short the budget.
+                timeout = None if best is None else max(0, deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    consider(*future.result())
+                if (best is not None and finished()) or not pending:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return best, stats
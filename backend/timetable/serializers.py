@@ -2,7 +2,7 @@
 Serializers for timetable app.
 """
 from rest_framework import serializers
-from .models import Room, TimeSlot, Timetable, ScheduleGenerationLog
+from .models import Room, TimeSlot, Timetable, TimetableVersion, ScheduleGenerationLog
 from accounts.serializers import CourseSerializer, UserSerializer
 
 
@@ -34,7 +34,18 @@ class TimetableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Timetable
         fields = '__all__'
-        read_only_fields = ('created_at',)
+        read_only_fields = ('version', 'created_at',)
+
+
+class TimetableVersionSerializer(serializers.ModelSerializer):
+    """Timetable version serializer."""
+    entry_count = serializers.IntegerField(read_only=True)
+    is_published = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = TimetableVersion
+        fields = '__all__'
+        read_only_fields = ('created_by', 'created_at', 'published_at')
 
 
 class ScheduleGenerationLogSerializer(serializers.ModelSerializer):
@@ -44,3 +55,62 @@ class ScheduleGenerationLogSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('generated_at',)
 
+
+class RoomChangeSerializer(serializers.Serializer):
+    """Room added in a what-if scenario."""
+    name = serializers.CharField(max_length=50)
+    capacity = serializers.IntegerField(min_value=1)
+
+
+class TimeSlotChangeSerializer(serializers.Serializer):
+    """Time slot added in a what-if scenario."""
+    day = serializers.ChoiceField(choices=TimeSlot.DAY_CHOICES)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+
+class ScenarioSerializer(serializers.Serializer):
+    """Changes to rooms and time slots for a dry-run scenario."""
+    label = serializers.CharField(required=False, allow_blank=True)
+    add_rooms = RoomChangeSerializer(many=True, required=False)
+    remove_room_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    room_capacities = serializers.DictField(child=serializers.IntegerField(min_value=0), required=False)
+    add_time_slots = TimeSlotChangeSerializer(many=True, required=False)
+    remove_time_slot_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    
+    def validate_room_capacities(self, value):
+        try:
+            return {int(room_id): capacity for room_id, capacity in value.items()}
+        except ValueError:
+            raise serializers.ValidationError('Keys must be room ids.')
+
+
+class DryRunSerializer(ScenarioSerializer):
+    """Dry-run request: one scenario inline, or several under ``scenarios``."""
+    # Every scenario runs inside the request, so their searches share one limit
+    MAX_SCENARIOS = 10
+    MAX_SEARCH_TIME = 30
+
+    scenarios = ScenarioSerializer(many=True, required=False, max_length=MAX_SCENARIOS)
+    search_time_budget = serializers.FloatField(required=False, min_value=0.1, max_value=MAX_SEARCH_TIME)
+    
+    def validate(self, attrs):
+        budget = attrs.get('search_time_budget')
+        if budget and budget * len(attrs.get('scenarios') or [attrs]) > self.MAX_SEARCH_TIME:
+            raise serializers.ValidationError({
+                'search_time_budget': f'Searches of all scenarios may take at most {self.MAX_SEARCH_TIME} seconds.'
+            })
+        return attrs
+
+
+class GenerateSerializer(serializers.Serializer):
+    """Timetable generation request."""
+    semester = serializers.IntegerField(default=1, min_value=1)
+    academic_year = serializers.CharField(default='2024-2025', max_length=20)
+    publish = serializers.BooleanField(default=True)
+    incremental = serializers.BooleanField(default=False)
+    course_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    room_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    time_slot_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    # Jobs run in the background, so they may search longer than a dry run
+    search_time_budget = serializers.FloatField(required=False, min_value=0.1, max_value=300)
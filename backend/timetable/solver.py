@@ -0,0 +1,159 @@
+"""
+In-memory timetable solver.
+
+Everything the scheduler needs is loaded once into a ``ScheduleSnapshot`` of
+plain tuples, and all conflict checks run against in-memory occupancy, so the
+cost of a run grows with the size of the problem rather than with database
+round-trips.
+"""
+from collections import Counter, namedtuple
+from django.db.models import Count
+from accounts.models import Course
+from .conflicts import CourseConflictGraph
+from .models import Room, TimeSlot
+from .occupancy import OccupancyIndex
+
+
+CourseInfo = namedtuple('CourseInfo', 'id code teacher_id teacher_email enrollment sessions', defaults=(1,))
+RoomInfo = namedtuple('RoomInfo', 'id name capacity')
+SlotInfo = namedtuple('SlotInfo', 'id day start_time end_time')
+Placement = namedtuple('Placement', 'course_id teacher_id room_id time_slot_id')
+
+
+class ScheduleSnapshot:
+    """Plain-data view of the courses, rooms, time slots and student conflicts to schedule."""
+
+    def __init__(self, courses, rooms, time_slots, conflicts=None):
+        self.courses = list(courses)
+        self.rooms = list(rooms)
+        self.time_slots = list(time_slots)
+        self.conflicts = conflicts or CourseConflictGraph()
+        self.courses_by_id = {course.id: course for course in self.courses}
+        self.rooms_by_id = {room.id: room for room in self.rooms}
+        self.slots_by_id = {slot.id: slot for slot in self.time_slots}
+        self.day_count = len({slot.day for slot in self.time_slots})
+
+    def with_changes(self, add_rooms=(), remove_room_ids=(), room_capacities=None, add_time_slots=(),
+                     remove_time_slot_ids=()):
+        """
+        Copy of the snapshot with rooms and time slots added, removed or
+        resized, for what-if runs. Added rooms and slots get negative ids.
+        """
+        removed_rooms, removed_slots = set(remove_room_ids), set(remove_time_slot_ids)
+        capacities = room_capacities or {}
+        rooms = [
+            room._replace(capacity=capacities.get(room.id, room.capacity))
+            for room in self.rooms if room.id not in removed_rooms
+        ]
+        rooms += [RoomInfo(-i, room['name'], room['capacity']) for i, room in enumerate(add_rooms, 1)]
+        time_slots = [slot for slot in self.time_slots if slot.id not in removed_slots]
+        time_slots += [
+            SlotInfo(-i, slot['day'], slot['start_time'], slot['end_time'])
+            for i, slot in enumerate(add_time_slots, 1)
+        ]
+        time_slots.sort(key=lambda slot: (slot.day, slot.start_time))
+        return ScheduleSnapshot(self.courses, rooms, time_slots, self.conflicts)
+
+    def occupancy(self):
+        """Empty occupancy index over the snapshot's rooms and slots."""
+        return OccupancyIndex(self.rooms, self.time_slots)
+
+    @classmethod
+    def load(cls):
+        """Load a snapshot with one query per table, plus one for the conflict graph."""
+        courses = (
+            Course.objects.annotate(enrollment=Count('students'))
+            .filter(enrollment__gt=0)
+            .values_list('id', 'code', 'teacher_id', 'teacher__email', 'enrollment', 'sessions_per_week', 'credits')
+        )
+        rooms = Room.objects.values_list('id', 'name', 'capacity')
+        time_slots = TimeSlot.objects.order_by('day', 'start_time').values_list(
+            'id', 'day', 'start_time', 'end_time'
+        )
+        return cls(
+            [CourseInfo(*row, Course.count_weekly_sessions(sessions, credits)) for *row, sessions, credits in courses],
+            [RoomInfo(*row) for row in rooms],
+            [SlotInfo(*row) for row in time_slots],
+            CourseConflictGraph.load(),
+        )
+
+
+class SolveResult:
+    """
+    Outcome of a solver run.
+
+    ``unscheduled`` lists the courses that did not get all their sessions;
+    any sessions that could be placed for them are still in ``placements``.
+    """
+
+    def __init__(self, placements, unscheduled, conflicts_found, conflicts_resolved):
+        self.placements = placements
+        self.unscheduled = unscheduled
+        self.conflicts_found = conflicts_found
+        self.conflicts_resolved = conflicts_resolved
+
+
+def solve(snapshot, order=None, index=None, placed=None, progress=None):
+    """
+    Greedily place every session of every course in the first slots where its
+    teacher is free, no course sharing its students is booked, and a large
+    enough room is available, taking the smallest room that fits.
+
+    Sessions of one course are spread over the week: a course gets at most
+    ``ceil(sessions / days)`` sessions on any one day, i.e. one per day when
+    there are enough days.
+
+    ``order`` is an optional sequence of course ids giving the courses to
+    place and their order; it defaults to every course in snapshot order.
+    ``index`` may be an ``OccupancyIndex`` already holding bookings that must
+    be kept; it is updated in place. ``placed`` maps course ids to the slot
+    ids of sessions already kept, which count towards the course's sessions.
+    ``progress`` is called with the fraction of courses processed so far.
+    """
+    courses = snapshot.courses if order is None else [snapshot.courses_by_id[course_id] for course_id in order]
+    if index is None:
+        index = snapshot.occupancy()
+    placed = placed or {}
+    days = max(1, snapshot.day_count)
+
+    placements = []
+    unscheduled = []
+    conflicts_found = 0
+    conflicts_resolved = 0
+
+    for done, course in enumerate(courses):
+        if progress:
+            progress(done / len(courses))
+        if not course.teacher_id:
+            unscheduled.append(course.id)
+            continue
+
+        kept = placed.get(course.id, ())
+        needed = course.sessions - len(kept)
+        max_per_day = -(-course.sessions // days)
+        per_day = Counter(snapshot.slots_by_id[slot_id].day for slot_id in kept)
+        neighbours = snapshot.conflicts.neighbours(course.id)
+
+        sessions = 0
+        for slot in snapshot.time_slots:
+            if sessions == needed:
+                break
+            if per_day[slot.day] >= max_per_day:
+                continue
+            if not index.is_teacher_free(course.teacher_id, slot.id) or index.has_student_clash(course.id, slot.id):
+                conflicts_found += 1
+                continue
+
+            room = index.first_free_room(slot.id, course.enrollment)
+            if room:
+                index.book(course.teacher_id, room.id, slot.id, neighbours)
+                placements.append(Placement(course.id, course.teacher_id, room.id, slot.id))
+                per_day[slot.day] += 1
+                sessions += 1
+
+        conflicts_resolved += sessions
+        if sessions < needed:
+            unscheduled.append(course.id)
+            conflicts_found += needed - sessions
+
+    return SolveResult(placements, unscheduled, conflicts_found, conflicts_resolved)
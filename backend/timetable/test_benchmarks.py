@@ -0,0 +1,31 @@
+"""
+Benchmarks for timetable generation.
+
+Run with ``pytest timetable/test_benchmarks.py --benchmark-only``; skipped
+when pytest-benchmark is not installed.
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from .benchmarks import build_synthetic_campus, measure_generation  # noqa: E402
+
+
+CAMPUS_SIZES = {
+    'small': {'courses': 20, 'rooms': 5, 'days': 5, 'slots_per_day': 4, 'students': 200, 'enrollment_density': 0.1},
+    'medium': {'courses': 150, 'rooms': 30, 'days': 5, 'slots_per_day': 8, 'students': 2000, 'enrollment_density': 0.02},
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', CAMPUS_SIZES)
+def test_generate_timetable_benchmark(benchmark, size):
+    build_synthetic_campus(**CAMPUS_SIZES[size])
+
+    stats = benchmark.pedantic(measure_generation, rounds=3, iterations=1)
+
+    benchmark.extra_info.update(stats)
+    # The query count must not grow with the size of the campus (SQLite may
+    # split the bulk insert into a couple of batches).
+    assert stats['queries'] <= 12
+    assert stats['courses_scheduled'] > 0
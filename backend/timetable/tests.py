@@ -0,0 +1,536 @@
+"""
+Tests for timetable app.
+"""
+from datetime import time
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from accounts.models import Department, Course
+from .conflicts import CourseConflictGraph
+from .jobs import claim_next_job, run_job
+from .models import Room, TimeSlot, Timetable, TimetableVersion, ScheduleGenerationLog
+from .occupancy import OccupancyIndex
+from .search import course_order, search
+from .solver import CourseInfo, RoomInfo, ScheduleSnapshot, SlotInfo, solve
+from .utils import generate_timetable, regenerate_timetable
+from .versions import create_version, publish_version, published_version
+
+User = get_user_model()
+
+
+class TimetableTestMixin:
+    """Small campus shared by the timetable tests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.build_campus()
+
+    @classmethod
+    def build_campus(cls, courses=4, rooms=2, students=5):
+        cls.admin = User.objects.create_user(
+            email='admin@example.com',
+            username='admin',
+            password='testpass123',
+            role='admin',
+            is_staff=True
+        )
+        cls.department = Department.objects.create(name='Computer Science', code='CS')
+        cls.teachers = [
+            User.objects.create_user(
+                email=f'teacher{i}@example.com',
+                username=f'teacher{i}',
+                password='testpass123',
+                role='teacher'
+            ) for i in range(2)
+        ]
+        cls.students = [
+            User.objects.create_user(
+                email=f'student{i}@example.com',
+                username=f'student{i}',
+                password='testpass123',
+                role='student'
+            ) for i in range(students)
+        ]
+        cls.courses = []
+        for i in range(courses):
+            course = Course.objects.create(
+                name=f'Course {i}',
+                code=f'CS{i:03d}',
+                department=cls.department,
+                teacher=cls.teachers[i % 2],
+                sessions_per_week=1
+            )
+            course.students.set(cls.students)
+            cls.courses.append(course)
+        cls.rooms = [
+            Room.objects.create(name=f'Room {i}', capacity=10 * (i + 1)) for i in range(rooms)
+        ]
+        cls.time_slots = [
+            TimeSlot.objects.create(day=day, start_time=time(hour, 0), end_time=time(hour + 1, 0))
+            for day in ('monday', 'tuesday')
+            for hour in (9, 11)
+        ]
+
+
+class GenerateTimetableTest(TimetableTestMixin, TestCase):
+    """Test the timetable generator."""
+
+    def test_generate_schedules_every_course(self):
+        result = generate_timetable(1, '2024-2025', self.admin)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['courses_scheduled'], 4)
+        self.assertEqual(Timetable.objects.count(), 4)
+
+    def test_generate_has_no_double_bookings(self):
+        generate_timetable(1, '2024-2025', self.admin)
+        entries = list(Timetable.objects.values_list('teacher_id', 'room_id', 'time_slot_id'))
+        self.assertEqual(len({(t, s) for t, _, s in entries}), len(entries))
+        self.assertEqual(len({(r, s) for _, r, s in entries}), len(entries))
+
+    def test_generate_separates_courses_sharing_students(self):
+        generate_timetable(1, '2024-2025', self.admin)
+        slots = list(Timetable.objects.values_list('time_slot_id', flat=True))
+        self.assertEqual(len(set(slots)), len(slots))
+
+    def test_generate_replaces_existing_semester(self):
+        generate_timetable(1, '2024-2025', self.admin)
+        result = generate_timetable(1, '2024-2025', self.admin)
+        self.assertEqual(Timetable.objects.published().filter(semester=1).count(), 4)
+        self.assertEqual(published_version(1, '2024-2025').id, result['version_id'])
+        self.assertEqual(TimetableVersion.objects.count(), 2)
+
+    def test_generate_query_count_is_independent_of_size(self):
+        generate_timetable(1, '2024-2025', self.admin)
+        with CaptureQueriesContext(connection) as small:
+            generate_timetable(1, '2024-2025', self.admin)
+        for i in range(4, 8):
+            course = Course.objects.create(
+                name=f'Course {i}', code=f'CS{i:03d}', department=self.department, teacher=self.teachers[i % 2],
+                sessions_per_week=1
+            )
+            course.students.set(self.students)
+        with CaptureQueriesContext(connection) as large:
+            generate_timetable(1, '2024-2025', self.admin)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class MultiSessionTest(TimetableTestMixin, TestCase):
+    """Test scheduling several weekly sessions per course."""
+
+    def setUp(self):
+        self.snapshot = ScheduleSnapshot(
+            [CourseInfo(1, 'A', 1, 'a@example.com', 10, 3), CourseInfo(2, 'B', 1, 'b@example.com', 10, 2)],
+            [RoomInfo(1, 'Room', 20)],
+            [SlotInfo(slot, day, None, None) for slot, day in enumerate(['monday'] * 2 + ['tuesday'] * 2 + ['wednesday'] * 2)]
+        )
+
+    def test_sessions_are_spread_over_days(self):
+        result = solve(self.snapshot)
+        self.assertEqual(result.unscheduled, [])
+        for course_id in (1, 2):
+            days = [self.snapshot.slots_by_id[p.time_slot_id].day for p in result.placements if p.course_id == course_id]
+            self.assertEqual(len(days), self.snapshot.courses_by_id[course_id].sessions)
+            self.assertEqual(len(set(days)), len(days))
+
+    def test_missing_sessions_leave_course_unscheduled(self):
+        snapshot = ScheduleSnapshot(self.snapshot.courses, self.snapshot.rooms, self.snapshot.time_slots[:2])
+        result = solve(snapshot)
+        self.assertEqual(result.unscheduled, [1, 2])
+        self.assertEqual(len(result.placements), 2)
+
+    def test_generate_uses_credits_by_default(self):
+        for course in self.courses[2:]:
+            course.students.clear()
+        Course.objects.filter(id=self.courses[0].id).update(sessions_per_week=None, credits=2)
+        Course.objects.filter(id=self.courses[1].id).update(sessions_per_week=None, credits=0)
+        result = generate_timetable(1, '2024-2025', self.admin)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(Timetable.objects.filter(course=self.courses[0]).count(), 2)
+        self.assertEqual(result['sessions_scheduled'], 3)
+
+
+class RegenerateTimetableTest(TimetableTestMixin, TestCase):
+    """Test incremental timetable repair."""
+
+    def setUp(self):
+        generate_timetable(1, '2024-2025', self.admin)
+        self.original = self.published_entries()
+
+    def published_entries(self):
+        return set(Timetable.objects.published().values_list('course_id', 'room_id', 'time_slot_id'))
+
+    def test_unchanged_timetable_is_kept(self):
+        versions = TimetableVersion.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            result = regenerate_timetable(1, '2024-2025', self.admin)
+        self.assertEqual(result['entries_kept'], 4)
+        self.assertEqual(result['entries_created'], 0)
+        self.assertEqual(result['entries_copied'], 0)
+        self.assertEqual(result['version_id'], published_version(1, '2024-2025').id)
+        self.assertEqual(self.published_entries(), self.original)
+        # Nothing changed, so nothing is written
+        self.assertEqual(TimetableVersion.objects.count(), versions)
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+
+    def test_draft_is_edited_in_place(self):
+        first = regenerate_timetable(1, '2024-2025', self.admin, room_ids=[self.rooms[0].id], publish=False)
+        self.assertEqual(first['entries_copied'], first['entries_kept'])
+        second = regenerate_timetable(1, '2024-2025', self.admin, room_ids=[self.rooms[1].id], publish=False)
+        self.assertEqual(second['version_id'], first['version_id'])
+        self.assertEqual(second['entries_copied'], 0)
+
+    def test_repair_after_rollback_starts_from_published_version(self):
+        rolled_back = published_version(1, '2024-2025')
+        newer = TimetableVersion.objects.get(id=generate_timetable(1, '2024-2025', self.admin)['version_id'])
+        publish_version(rolled_back, self.admin)
+
+        result = regenerate_timetable(1, '2024-2025', self.admin, room_ids=[self.rooms[0].id])
+        self.assertNotIn(result['version_id'], (rolled_back.id, newer.id))
+        self.assertEqual(TimetableVersion.objects.get(id=result['version_id']).base, rolled_back)
+        self.assertEqual(published_version(1, '2024-2025').id, result['version_id'])
+
+    def test_repair_leaves_published_version_until_published(self):
+        published = published_version(1, '2024-2025')
+        result = regenerate_timetable(1, '2024-2025', self.admin, room_ids=[self.rooms[0].id], publish=False)
+        self.assertNotEqual(result['version_id'], published.id)
+        self.assertEqual(published_version(1, '2024-2025'), published)
+        self.assertEqual(self.published_entries(), self.original)
+
+    def test_only_new_course_is_placed(self):
+        student = User.objects.create_user(
+            email='new@example.com', username='new', password='testpass123', role='student'
+        )
+        course = Course.objects.create(
+            name='New', code='CS999', department=self.department, teacher=self.teachers[0], sessions_per_week=1
+        )
+        course.students.set([student])
+        result = regenerate_timetable(1, '2024-2025', self.admin)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['entries_created'], 1)
+        self.assertTrue(self.original <= self.published_entries())
+
+    def test_removed_room_re_places_affected_entries(self):
+        room = self.rooms[0]
+        affected = Timetable.objects.published().filter(room=room).count()
+        room.delete()
+        result = regenerate_timetable(1, '2024-2025', self.admin, room_ids=[room.id])
+        self.assertEqual(result['entries_removed'], affected)
+        self.assertEqual(result['entries_kept'], 4 - affected)
+        self.assertFalse(Timetable.objects.published().filter(room__isnull=True).exists())
+        self.assertEqual(result['courses_scheduled'], 4)
+
+
+class CourseConflictGraphTest(TestCase):
+    """Test the course conflict graph."""
+
+    def test_from_enrollments_counts_shared_students(self):
+        graph = CourseConflictGraph.from_enrollments([(1, 10), (1, 11), (2, 10), (2, 11), (2, 12), (3, 13)])
+        self.assertEqual(graph.weight(10, 11), 2)
+        self.assertEqual(graph.weight(11, 12), 1)
+        self.assertEqual(graph.neighbours(13), {})
+        self.assertEqual(graph.degree(10), 3)
+        self.assertEqual(graph.edge_count, 3)
+
+    def test_load_matches_enrollment_table(self):
+        department = Department.objects.create(name='Maths', code='MA')
+        student = User.objects.create_user(email='s@example.com', username='s', password='testpass123')
+        first = Course.objects.create(name='A', code='MA1', department=department)
+        second = Course.objects.create(name='B', code='MA2', department=department)
+        first.students.add(student)
+        second.students.add(student)
+        self.assertEqual(CourseConflictGraph.load().weight(first.id, second.id), 1)
+
+
+class SearchTest(TestCase):
+    """Test the multi-start search."""
+
+    def setUp(self):
+        self.snapshot = ScheduleSnapshot(
+            [CourseInfo(i, f'C{i}', i % 3 + 1, f't{i % 3}@example.com', 10 * (i + 1)) for i in range(6)],
+            [RoomInfo(1, 'Small', 20), RoomInfo(2, 'Large', 60)],
+            [SlotInfo(s, 'monday', None, None) for s in range(4)]
+        )
+
+    def test_most_constrained_places_large_courses_first(self):
+        order = course_order(self.snapshot, [0, 1, 2, 3, 4, 5], 'most_constrained')
+        self.assertEqual(set(order[:4]), {2, 3, 4, 5})
+
+    def test_search_in_process(self):
+        result, stats = search(self.snapshot, time_budget=1, workers=1, max_starts=5)
+        self.assertEqual(len(result.placements), 6)
+        self.assertGreaterEqual(stats['starts'], 1)
+
+    def test_zero_budget_reports_progress(self):
+        reported = []
+        result, stats = search(self.snapshot, time_budget=0, workers=1, progress=reported.append)
+        self.assertEqual(stats['starts'], 1)
+        self.assertEqual(reported, [1.0])
+
+    def test_search_in_process_pool(self):
+        result, stats = search(self.snapshot, time_budget=5, workers=2, max_starts=4)
+        self.assertEqual(len(result.placements), 6)
+        self.assertEqual(stats['workers'], 2)
+        self.assertIsNotNone(stats['best_heuristic'])
+
+
+class OccupancyIndexTest(TestCase):
+    """Test the bitset occupancy index."""
+
+    def setUp(self):
+        self.index = OccupancyIndex(
+            [RoomInfo(1, 'Big', 100), RoomInfo(2, 'Small', 20), RoomInfo(3, 'Medium', 50)],
+            [SlotInfo(10, 'monday', None, None), SlotInfo(11, 'monday', None, None)]
+        )
+
+    def test_first_free_room_is_best_fit(self):
+        self.assertEqual(self.index.first_free_room(10, 30).id, 3)
+        self.assertEqual(self.index.free_room_ids(10, 30), [3, 1])
+        self.assertIsNone(self.index.first_free_room(10, 101))
+
+    def test_book_and_release(self):
+        self.index.book(7, 3, 10)
+        self.assertFalse(self.index.is_teacher_free(7, 10))
+        self.assertTrue(self.index.is_teacher_free(7, 11))
+        self.assertFalse(self.index.is_room_free(3, 10))
+        self.assertEqual(self.index.first_free_room(10, 30).id, 1)
+        self.index.release(7, 3, 10)
+        self.assertTrue(self.index.is_teacher_free(7, 10))
+        self.assertTrue(self.index.is_room_free(3, 10))
+
+
+class TimetableAPITest(TimetableTestMixin, TestCase):
+    """Test manual timetable edits."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.version = publish_version(create_version(1, '2024-2025', self.admin))
+        Timetable.objects.create(
+            version=self.version,
+            course=self.courses[0],
+            teacher=self.teachers[0],
+            room=self.rooms[0],
+            time_slot=self.time_slots[0]
+        )
+
+    def entry_data(self, **overrides):
+        data = {
+            'course_id': self.courses[1].id,
+            'teacher_id': self.teachers[1].id,
+            'room_id': self.rooms[1].id,
+            'time_slot_id': self.time_slots[0].id,
+        }
+        data.update(overrides)
+        return data
+
+    def test_create_without_conflict(self):
+        response = self.client.post('/api/timetable/', self.entry_data())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_create_rejects_teacher_conflict(self):
+        response = self.client.post('/api/timetable/', self.entry_data(teacher_id=self.teachers[0].id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('teacher_id', response.data)
+
+    def test_create_rejects_room_conflict(self):
+        response = self.client.post('/api/timetable/', self.entry_data(room_id=self.rooms[0].id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('room_id', response.data)
+
+    def test_update_does_not_conflict_with_itself(self):
+        entry = Timetable.objects.get()
+        response = self.client.patch(f'/api/timetable/{entry.id}/', {'room_id': self.rooms[0].id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_adds_to_published_version(self):
+        self.client.post('/api/timetable/', self.entry_data())
+        self.assertEqual(self.version.entries.count(), 2)
+
+    def test_drafts_do_not_conflict_with_published_entries(self):
+        draft = create_version(1, '2024-2025', self.admin)
+        Timetable.objects.create(
+            version=draft, course=self.courses[1], teacher=self.teachers[1], room=self.rooms[1], time_slot=self.time_slots[0]
+        )
+        response = self.client.post('/api/timetable/', self.entry_data())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class TimetableVersionTest(TimetableTestMixin, TestCase):
+    """Test versioned timetables, publishing and rollback."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.first = generate_timetable(1, '2024-2025', self.admin)['version_id']
+
+    def test_draft_is_hidden_until_published(self):
+        draft = generate_timetable(1, '2024-2025', self.admin, publish=False)['version_id']
+        response = self.client.get('/api/timetable/')
+        self.assertEqual({entry['version'] for entry in response.data['results']}, {self.first})
+
+        response = self.client.get(f'/api/timetable/?version={draft}')
+        self.assertEqual({entry['version'] for entry in response.data['results']}, {draft})
+        response = self.client.get('/api/timetable/?version=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(f'/api/timetable/versions/{draft}/publish/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_published'])
+        self.assertEqual(response.data['entry_count'], 4)
+        self.assertEqual(published_version(1, '2024-2025').id, draft)
+
+    def test_rollback_to_older_version(self):
+        generate_timetable(1, '2024-2025', self.admin)
+        self.client.post(f'/api/timetable/versions/{self.first}/publish/')
+        self.assertEqual(set(Timetable.objects.published().values_list('version_id', flat=True)), {self.first})
+
+        response = self.client.get('/api/timetable/versions/')
+        self.assertEqual([version['is_published'] for version in response.data['results']], [False, True])
+
+    def test_backfill_publishes_unversioned_entries(self):
+        Timetable.objects.create(
+            course=self.courses[0], teacher=self.teachers[0], room=self.rooms[0], time_slot=self.time_slots[0],
+            semester=2, academic_year='2023-2024'
+        )
+        legacy = Timetable.objects.filter(version=self.first).first()
+        Timetable.objects.filter(id=legacy.id).update(version=None)
+        call_command('backfill_timetable_versions', stdout=StringIO())
+
+        self.assertFalse(Timetable.objects.filter(version__isnull=True).exists())
+        self.assertEqual(Timetable.objects.published().filter(semester=2, academic_year='2023-2024').count(), 1)
+        # A semester that already has a published version keeps it
+        self.assertEqual(published_version(1, '2024-2025').id, self.first)
+
+    def test_versions_are_admin_only(self):
+        self.client.force_authenticate(user=self.teachers[0])
+        response = self.client.get('/api/timetable/versions/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GenerationJobTest(TimetableTestMixin, TestCase):
+    """Test background generation jobs."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_generate_queues_job(self):
+        response = self.client.post('/api/timetable/generate/', {'semester': 2, 'academic_year': '2025-2026'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ScheduleGenerationLog.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, 'queued')
+        self.assertTrue(job.options['publish'])
+        self.assertFalse(Timetable.objects.exists())
+
+    def test_publish_is_validated(self):
+        response = self.client.post('/api/timetable/generate/', {'publish': 'false'})
+        job = ScheduleGenerationLog.objects.get(id=response.data['job_id'])
+        self.assertFalse(job.options['publish'])
+        response = self.client.post('/api/timetable/generate/', {'publish': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('publish', response.data)
+
+    def test_worker_runs_job_and_reports_progress(self):
+        response = self.client.post('/api/timetable/generate/', {'semester': 2, 'academic_year': '2025-2026'})
+        call_command('process_timetable_jobs', '--once', stdout=StringIO())
+
+        job = ScheduleGenerationLog.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, 'success')
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(set(job.phase_timings), {'loading', 'solving', 'writing'})
+        self.assertEqual(len(job.result['timetable']), 4)
+        self.assertEqual(Timetable.objects.published().filter(semester=2, academic_year='2025-2026').count(), 4)
+
+        response = self.client.get(f'/api/timetable/generation-logs/{job.id}/progress/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'success')
+        self.assertNotIn('result', response.data)
+
+    def test_incremental_ids_are_validated(self):
+        response = self.client.post('/api/timetable/generate/', {
+            'incremental': True, 'course_ids': ['3', 4], 'room_ids': [], 'time_slot_ids': [],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ScheduleGenerationLog.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.options['course_ids'], [3, 4])
+
+        response = self.client.post('/api/timetable/generate/', {'incremental': True, 'room_ids': 7}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('room_ids', response.data)
+        response = self.client.post('/api/timetable/generate/', {'incremental': True, 'course_ids': ['x']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_time_budget_is_bounded(self):
+        for budget in ('0', -1, 10000, 'soon'):
+            response = self.client.post('/api/timetable/generate/', {'search_time_budget': budget}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('search_time_budget', response.data)
+        self.assertFalse(ScheduleGenerationLog.objects.exists())
+
+    def test_job_is_claimed_once(self):
+        self.client.post('/api/timetable/generate/', {})
+        job = claim_next_job()
+        self.assertEqual(job.status, 'running')
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(run_job(job).status, 'success')
+
+
+class DryRunTest(TimetableTestMixin, TestCase):
+    """Test what-if timetable previews."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_dry_run_never_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/timetable/dry-run/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['scenarios'][0]['status'], 'success')
+        self.assertFalse(Timetable.objects.exists())
+        for query in queries.captured_queries:
+            self.assertFalse(query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')), query['sql'])
+
+    def test_dry_run_scenarios(self):
+        response = self.client.post('/api/timetable/dry-run/', {
+            'scenarios': [
+                {'label': 'fewer slots', 'remove_time_slot_ids': [slot.id for slot in self.time_slots[:2]]},
+                {
+                    'label': 'more slots',
+                    'remove_time_slot_ids': [slot.id for slot in self.time_slots[:2]],
+                    'add_time_slots': [
+                        {'day': 'wednesday', 'start_time': '09:00', 'end_time': '10:00'},
+                        {'day': 'thursday', 'start_time': '09:00', 'end_time': '10:00'},
+                    ],
+                },
+                {'label': 'tiny rooms', 'room_capacities': {str(room.id): 1 for room in self.rooms}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        fewer, more, tiny = response.data['scenarios']
+        self.assertEqual(fewer['status'], 'partial')
+        self.assertEqual(len(fewer['unscheduled_courses']), 2)
+        self.assertEqual(more['status'], 'success')
+        self.assertEqual(more['room_utilisation'], 0.5)
+        self.assertEqual(tiny['status'], 'failed')
+
+    def test_dry_run_limits_scenarios_and_search_time(self):
+        response = self.client.post('/api/timetable/dry-run/', {'scenarios': [{}] * 11}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('scenarios', response.data)
+
+        response = self.client.post(
+            '/api/timetable/dry-run/', {'scenarios': [{}] * 3, 'search_time_budget': 20}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('search_time_budget', response.data)
+
+    def test_dry_run_is_admin_only(self):
+        self.client.force_authenticate(user=self.teachers[0])
+        response = self.client.post('/api/timetable/dry-run/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -3,13 +3,15 @@ URLs for timetable app.
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RoomViewSet, TimeSlotViewSet, TimetableViewSet, ScheduleGenerationLogViewSet
+from .views import RoomViewSet, TimeSlotViewSet, TimetableViewSet, TimetableVersionViewSet, ScheduleGenerationLogViewSet
 
 router = DefaultRouter()
 router.register(r'rooms', RoomViewSet, basename='room')
 router.register(r'time-slots', TimeSlotViewSet, basename='timeslot')
-router.register(r'', TimetableViewSet, basename='timetable')
 router.register(r'generation-logs', ScheduleGenerationLogViewSet, basename='generation-log')
+router.register(r'versions', TimetableVersionViewSet, basename='timetable-version')
+# Registered last so its detail route does not shadow the prefixes above
+router.register(r'', TimetableViewSet, basename='timetable')
 
 urlpatterns = [
     path('', include(router.urls)),
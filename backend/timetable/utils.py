@@ -1,92 +1,254 @@
 """
 Timetable generation utilities.
 """
-from django.db.models import Q
-from .models import Timetable, Room, TimeSlot
-from accounts.models import Course
+from collections import Counter, defaultdict
+from django.db import transaction
+from .models import Timetable
+from .search import course_order, search
+from .solver import ScheduleSnapshot, solve
+from .versions import create_version, publish_version, published_version, working_draft
 
 
-def generate_timetable(semester, academic_year, generated_by):
+def generate_timetable(semester, academic_year, generated_by, search_options=None, progress=None, publish=True):
     """
     Generate timetable using a simple greedy algorithm.
     Returns a dict with status, courses_scheduled, conflicts info.
+    Each course gets ``Course.weekly_sessions`` entries, spread over the week.
+
+    Courses, rooms and slots are loaded once and solved in memory (see
+    ``timetable.solver``); the result is written with a single bulk insert.
+    With ``search_options`` (keyword arguments for ``timetable.search.search``,
+    e.g. ``{'time_budget': 30}``) many course orderings are tried in parallel
+    and the best is kept. ``progress``, if given, is called as
+    ``progress(phase, fraction)``.
+
+    The timetable is written into a new ``TimetableVersion``; the published
+    one is left alone until the new version is complete and, with
+    ``publish``, switched over to it in the same transaction.
+    """
+    progress = progress or _no_progress
+    progress('loading', 0)
+    snapshot = ScheduleSnapshot.load()
+    result, search_stats = _solve(snapshot, None, None, None, search_options, progress)
+    progress('writing', 0)
+
+    with transaction.atomic():
+        version = create_version(semester, academic_year, generated_by, note='Generated')
+        entries = Timetable.objects.bulk_create(build_entries(result.placements, semester, academic_year, version))
+        if publish:
+            publish_version(version, generated_by)
+
+    summary = summarize(snapshot, result, entries, len(entries))
+    summary.update({'version_id': version.id, 'published': publish})
+    if search_stats:
+        summary['search'] = search_stats
+    return summary
+
+
+def regenerate_timetable(semester, academic_year, generated_by, course_ids=(), room_ids=(), time_slot_ids=(),
+                         search_options=None, progress=None, publish=True):
+    """
+    Incrementally repair the timetable of a semester.
+
+    Existing entries are kept unless they involve one of the changed courses,
+    rooms or time slots, or no longer hold (the course lost its students or
+    changed teacher, the room was removed or is now too small, the course
+    already has enough sessions that week or that day, or the entry clashes
+    with one already kept, including sharing students with it). Only the
+    missing sessions are placed, and only the removed and added entries are
+    written.
+
+    The repair is never made on the published version. An unpublished draft
+    derived from it (see ``versions.working_draft``) is edited in place;
+    otherwise, if anything changes, a new draft based on the published
+    version is created holding its kept entries (``entries_copied``) plus the
+    new ones. A repair that changes nothing writes nothing. The draft is
+    published afterwards when ``publish`` is set.
     """
-    courses = Course.objects.filter(students__isnull=False).distinct()
-    rooms = Room.objects.all()
-    time_slots = TimeSlot.objects.all().order_by('day', 'start_time')
-    
-    scheduled = []
-    conflicts_found = 0
-    conflicts_resolved = 0
-    
-    # Clear existing timetable for this semester/year
-    Timetable.objects.filter(semester=semester, academic_year=academic_year).delete()
-    
-    for course in courses:
-        if not course.teacher:
+    progress = progress or _no_progress
+    progress('loading', 0)
+    published = published_version(semester, academic_year)
+    draft = working_draft(semester, academic_year)
+    source = draft or published
+    snapshot = ScheduleSnapshot.load()
+    index = snapshot.occupancy()
+    changed_courses, changed_rooms, changed_slots = set(course_ids), set(room_ids), set(time_slot_ids)
+
+    kept = defaultdict(list)
+    kept_per_day = Counter()
+    days = max(1, snapshot.day_count)
+    stale = []
+    kept_rows = []
+    existing = source.entries.order_by('id').values_list(
+        'id', 'course_id', 'teacher_id', 'room_id', 'time_slot_id'
+    ) if source else []
+    for entry_id, course_id, teacher_id, room_id, time_slot_id in existing:
+        course = snapshot.courses_by_id.get(course_id)
+        room = snapshot.rooms_by_id.get(room_id)
+        slot = snapshot.slots_by_id.get(time_slot_id)
+        if (
+            course is None or room is None or slot is None
+            or course_id in changed_courses or room_id in changed_rooms or time_slot_id in changed_slots
+            or len(kept[course_id]) >= course.sessions
+            or kept_per_day[course_id, slot.day] >= -(-course.sessions // days)
+            or teacher_id != course.teacher_id
+            or room.capacity < course.enrollment
+            or not index.is_teacher_free(teacher_id, time_slot_id)
+            or not index.is_room_free(room_id, time_slot_id)
+            or index.has_student_clash(course_id, time_slot_id)
+        ):
+            stale.append(entry_id)
             continue
-        
-        scheduled_this_course = False
-        
-        for time_slot in time_slots:
-            # Check for teacher conflict
-            teacher_busy = Timetable.objects.filter(
-                teacher=course.teacher,
-                time_slot=time_slot,
-                semester=semester,
-                academic_year=academic_year
-            ).exists()
-            
-            if teacher_busy:
-                conflicts_found += 1
-                continue
-            
-            # Check for room availability
-            available_room = None
-            for room in rooms:
-                room_busy = Timetable.objects.filter(
-                    room=room,
-                    time_slot=time_slot,
-                    semester=semester,
-                    academic_year=academic_year
-                ).exists()
-                
-                if not room_busy and room.capacity >= course.students.count():
-                    available_room = room
-                    break
-            
-            if available_room:
-                timetable_entry = Timetable.objects.create(
-                    course=course,
-                    teacher=course.teacher,
-                    room=available_room,
-                    time_slot=time_slot,
-                    semester=semester,
-                    academic_year=academic_year
+        index.book(teacher_id, room_id, time_slot_id, snapshot.conflicts.neighbours(course_id))
+        kept[course_id].append(time_slot_id)
+        kept_per_day[course_id, slot.day] += 1
+        kept_rows.append((course_id, teacher_id, room_id, time_slot_id))
+
+    kept_sessions = sum(len(slots) for slots in kept.values())
+    to_place = [course.id for course in snapshot.courses if len(kept[course.id]) < course.sessions]
+    result, search_stats = _solve(snapshot, to_place, index, kept, search_options, progress)
+    progress('writing', 0)
+
+    copied = 0
+    version = source
+    with transaction.atomic():
+        if draft is None and (stale or result.placements or source is None):
+            # Start a draft from the published version, without the stale entries
+            version = create_version(semester, academic_year, generated_by, note='Incremental update', base=published)
+            copied = len(Timetable.objects.bulk_create([
+                Timetable(
+                    version=version, course_id=course_id, teacher_id=teacher_id, room_id=room_id,
+                    time_slot_id=time_slot_id, semester=semester, academic_year=academic_year
                 )
-                scheduled.append(timetable_entry)
-                scheduled_this_course = True
-                conflicts_resolved += 1
-                break
-        
-        if not scheduled_this_course:
-            conflicts_found += 1
-    
-    status = 'success' if len(scheduled) == courses.count() else 'partial'
-    if len(scheduled) == 0:
+                for course_id, teacher_id, room_id, time_slot_id in kept_rows
+            ], batch_size=1000))
+        elif stale:
+            Timetable.objects.filter(id__in=stale).delete()
+        entries = Timetable.objects.bulk_create(build_entries(result.placements, semester, academic_year, version))
+        if publish and version != published:
+            publish_version(version, generated_by)
+
+    summary = summarize(snapshot, result, entries, kept_sessions + len(entries))
+    summary.update({
+        'version_id': version.id,
+        'published': publish or version == published,
+        'entries_kept': kept_sessions,
+        'entries_removed': len(stale),
+        'entries_created': len(entries),
+        'entries_copied': copied,
+    })
+    if search_stats:
+        summary['search'] = search_stats
+    return summary
+
+
+def preview_timetable(snapshot, search_options=None, **changes):
+    """
+    Solve a what-if scenario entirely in memory, without touching the database.
+
+    ``changes`` are passed to ``ScheduleSnapshot.with_changes``. Returns
+    utilisation, the courses left unscheduled and conflict statistics.
+    """
+    scenario = snapshot.with_changes(**changes)
+    result, search_stats = _solve(scenario, None, None, None, search_options, _no_progress)
+
+    room_slots = len(scenario.rooms) * len(scenario.time_slots)
+    seats_booked = sum(scenario.rooms_by_id[placement.room_id].capacity for placement in result.placements)
+    seats_used = sum(scenario.courses_by_id[placement.course_id].enrollment for placement in result.placements)
+    preview = {
+        'status': summarize(scenario, result, [], len(result.placements))['status'],
+        'courses_total': len(scenario.courses),
+        'courses_scheduled': len(scenario.courses) - len(result.unscheduled),
+        'sessions_required': sum(course.sessions for course in scenario.courses),
+        'sessions_scheduled': len(result.placements),
+        'rooms': len(scenario.rooms),
+        'time_slots': len(scenario.time_slots),
+        'room_utilisation': round(len(result.placements) / room_slots, 4) if room_slots else 0,
+        'seat_utilisation': round(seats_used / seats_booked, 4) if seats_booked else 0,
+        'unscheduled_courses': [
+            {'id': course_id, 'code': scenario.courses_by_id[course_id].code}
+            for course_id in result.unscheduled
+        ],
+        'conflicts': {
+            'found': result.conflicts_found,
+            'resolved': result.conflicts_resolved,
+            'student_conflict_pairs': scenario.conflicts.edge_count,
+        },
+    }
+    if search_stats:
+        preview['search'] = search_stats
+    return preview
+
+
+def _solve(snapshot, course_ids, index, placed, search_options, progress):
+    """
+    Run the plain solver, or the multi-start search when options are given.
+
+    The plain solver places courses with the most shared students first, as
+    in graph colouring, so heavily linked courses get first pick of slots.
+    """
+    def report(fraction):
+        progress('solving', fraction)
+
+    report(0)
+    if search_options is None:
+        if course_ids is None:
+            course_ids = [course.id for course in snapshot.courses]
+        order = course_order(snapshot, course_ids, 'largest_degree')
+        return solve(snapshot, order=order, index=index, placed=placed, progress=report), None
+    return search(snapshot, course_ids=course_ids, index=index, placed=placed, progress=report, **search_options)
+
+
+def _no_progress(phase, fraction):
+    pass
+
+
+def build_entries(placements, semester, academic_year, version=None):
+    """Unsaved ``Timetable`` rows for solver placements."""
+    return [Timetable(
+        version=version,
+        course_id=placement.course_id,
+        teacher_id=placement.teacher_id,
+        room_id=placement.room_id,
+        time_slot_id=placement.time_slot_id,
+        semester=semester,
+        academic_year=academic_year
+    ) for placement in placements]
+
+
+def summarize(snapshot, result, entries, sessions_scheduled):
+    """
+    Result dict reported by the generate endpoint and generation log.
+
+    A course counts as scheduled once all of its weekly sessions are placed.
+    """
+    scheduled = len(snapshot.courses) - len(result.unscheduled)
+    status = 'success' if not result.unscheduled else 'partial'
+    if sessions_scheduled == 0:
         status = 'failed'
-    
+
     return {
         'status': status,
-        'courses_scheduled': len(scheduled),
-        'conflicts_found': conflicts_found,
-        'conflicts_resolved': conflicts_resolved,
-        'timetable': [{
-            'id': t.id,
-            'course': t.course.code,
-            'teacher': t.teacher.email,
-            'room': t.room.name if t.room else None,
-            'time_slot': f"{t.time_slot.day} {t.time_slot.start_time}-{t.time_slot.end_time}"
-        } for t in scheduled]
+        'courses_scheduled': scheduled,
+        'sessions_scheduled': sessions_scheduled,
+        'conflicts_found': result.conflicts_found,
+        'conflicts_resolved': result.conflicts_resolved,
+        'timetable': [
+            describe_entry(snapshot, entry.id, placement)
+            for entry, placement in zip(entries, result.placements)
+        ]
     }
 
+
+def describe_entry(snapshot, entry_id, placement):
+    """Render a placement the way the generate endpoint reports it."""
+    course = snapshot.courses_by_id[placement.course_id]
+    room = snapshot.rooms_by_id.get(placement.room_id)
+    slot = snapshot.slots_by_id[placement.time_slot_id]
+    return {
+        'id': entry_id,
+        'course': course.code,
+        'teacher': course.teacher_email,
+        'room': room.name if room else None,
+        'time_slot': f"{slot.day} {slot.start_time}-{slot.end_time}"
+    }
@@ -0,0 +1,75 @@
+"""
+Timetable versions and atomic publishing.
+"""
+from django.db import transaction
+from django.utils import timezone
+from .models import PublishedTimetable, Timetable, TimetableVersion
+
+
+def published_version(semester, academic_year):
+    """The published version of a semester, or None."""
+    pointer = PublishedTimetable.objects.select_related('version').filter(
+        semester=semester, academic_year=academic_year
+    ).first()
+    return pointer.version if pointer else None
+
+
+def publish_version(version, user=None):
+    """
+    Make ``version`` the published timetable of its semester.
+
+    Only the semester's pointer row changes, inside one transaction, so
+    readers see either the old or the new version, never a mix. Publishing an
+    older version is an instant rollback.
+    """
+    with transaction.atomic():
+        # update_or_create locks the pointer row while it is switched.
+        PublishedTimetable.objects.update_or_create(
+            semester=version.semester,
+            academic_year=version.academic_year,
+            defaults={'version': version, 'published_by': user}
+        )
+        version.published_at = timezone.now()
+        version.save(update_fields=['published_at'])
+    return version
+
+
+def create_version(semester, academic_year, user=None, note='', base=None):
+    """Create an empty draft version."""
+    return TimetableVersion.objects.create(
+        semester=semester, academic_year=academic_year, created_by=user, note=note, base=base
+    )
+
+
+def working_draft(semester, academic_year):
+    """
+    The unpublished draft derived from the currently published version, or
+    None. Drafts of a version that has since been replaced or rolled back
+    are ignored, so repairs always start from what is published.
+    """
+    published = published_version(semester, academic_year)
+    return TimetableVersion.objects.filter(
+        semester=semester, academic_year=academic_year, base=published, published_at__isnull=True
+    ).order_by('-id').first()
+
+
+def adopt_unversioned_entries():
+    """
+    Wrap timetable entries that predate versioning (``version`` is null) in
+    one version per semester, published unless the semester already has a
+    published version. Returns the versions created.
+    """
+    created = []
+    semesters = Timetable.objects.filter(version__isnull=True).values_list(
+        'semester', 'academic_year'
+    ).distinct().order_by('academic_year', 'semester')
+    for semester, academic_year in semesters:
+        with transaction.atomic():
+            version = create_version(semester, academic_year, note='Entries from before versioning')
+            Timetable.objects.filter(
+                version__isnull=True, semester=semester, academic_year=academic_year
+            ).update(version=version)
+            if published_version(semester, academic_year) is None:
+                publish_version(version)
+        created.append(version)
+    return created
@@ -3,12 +3,20 @@ Views for timetable app.
 """
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Room, TimeSlot, Timetable, ScheduleGenerationLog
-from .serializers import RoomSerializer, TimeSlotSerializer, TimetableSerializer, ScheduleGenerationLogSerializer
+from django.db.models import Count, Exists, OuterRef, Q
+from .models import Room, TimeSlot, Timetable, TimetableVersion, PublishedTimetable, ScheduleGenerationLog
+from .serializers import (
+    RoomSerializer, TimeSlotSerializer, TimetableSerializer, TimetableVersionSerializer,
+    ScheduleGenerationLogSerializer, DryRunSerializer, GenerateSerializer
+)
 from accounts.models import Course
-from .utils import generate_timetable
+from .occupancy import OccupancyIndex
+from .jobs import enqueue_generation
+from .solver import ScheduleSnapshot
+from .utils import preview_timetable
+from .versions import create_version, publish_version, published_version
 
 
 class RoomViewSet(viewsets.ModelViewSet):
@@ -26,7 +34,12 @@ class TimeSlotViewSet(viewsets.ModelViewSet):
 
 
 class TimetableViewSet(viewsets.ModelViewSet):
-    """ViewSet for timetable."""
+    """
+    ViewSet for timetable.
+    
+    Only entries of published versions are listed; admins can look at a
+    draft with ``?version=<id>``.
+    """
     serializer_class = TimetableSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -34,8 +47,14 @@ class TimetableViewSet(viewsets.ModelViewSet):
         user = self.request.user
         semester = self.request.query_params.get('semester')
         academic_year = self.request.query_params.get('academic_year')
+        version = self.request.query_params.get('version')
         
-        queryset = Timetable.objects.all()
+        if version and user.is_staff:
+            if not version.isdigit():
+                raise ValidationError({'version': 'A valid integer is required.'})
+            queryset = Timetable.objects.filter(version_id=version)
+        else:
+            queryset = Timetable.objects.published()
         
         if user.is_student:
             # Show timetable for courses student is enrolled in
@@ -51,43 +70,145 @@ class TimetableViewSet(viewsets.ModelViewSet):
         
         return queryset.order_by('time_slot__day', 'time_slot__start_time')
     
+    def perform_create(self, serializer):
+        """Add the entry to the published version, publishing a first one if needed."""
+        self._check_conflicts(serializer.validated_data)
+        semester, academic_year = self._semester(serializer.validated_data)
+        version = published_version(semester, academic_year)
+        if version is None:
+            version = create_version(semester, academic_year, self.request.user, note='Manual entries')
+            publish_version(version, self.request.user)
+        serializer.save(version=version)
+    
+    def perform_update(self, serializer):
+        self._check_conflicts(serializer.validated_data, serializer.instance)
+        serializer.save()
+    
+    def _semester(self, data, instance=None):
+        def current(field):
+            return data.get(field, getattr(instance, field, Timetable._meta.get_field(field).default))
+        return current('semester'), current('academic_year')
+    
+    def _check_conflicts(self, data, instance=None):
+        """Reject entries that double-book a teacher or room in a time slot."""
+        def current(field, default=None):
+            return data.get(field, getattr(instance, field, default))
+        
+        semester, academic_year = self._semester(data, instance)
+        index = OccupancyIndex.load(
+            semester,
+            academic_year,
+            exclude_id=instance.id if instance else None,
+            version=instance.version if instance else None
+        )
+        time_slot_id = current('time_slot_id')
+        room_id = current('room_id')
+        if time_slot_id not in index.slot_bits:
+            raise ValidationError({'time_slot_id': 'Time slot does not exist.'})
+        if room_id is not None and room_id not in index.room_bits:
+            raise ValidationError({'room_id': 'Room does not exist.'})
+        
+        errors = {}
+        if not index.is_teacher_free(current('teacher_id'), time_slot_id):
+            errors['teacher_id'] = 'Teacher is already scheduled in this time slot.'
+        if room_id is not None and not index.is_room_free(room_id, time_slot_id):
+            errors['room_id'] = 'Room is already booked in this time slot.'
+        if errors:
+            raise ValidationError(errors)
+    
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def generate(self, request):
-        """Generate timetable automatically (admin only)."""
-        semester = request.data.get('semester', 1)
-        academic_year = request.data.get('academic_year', '2024-2025')
+        """
+        Queue automatic timetable generation (admin only).
+        
+        Returns the id of a background job at once; the job is run by the
+        ``process_timetable_jobs`` worker and reports its progress on the
+        generation log. With ``incremental`` set, only entries affected by
+        the given ``course_ids``, ``room_ids`` and ``time_slot_ids`` (or no
+        longer valid) are re-placed instead of rebuilding the whole semester.
+        With ``search_time_budget`` (seconds) the job searches many course
+        orderings in parallel and keeps the best schedule found.
+        
+        The result is written as a new timetable version and published when
+        the job finishes, unless ``publish`` is false.
+        """
+        serializer = GenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        options = {'publish': data['publish']}
+        if data['incremental']:
+            options.update({
+                'incremental': True,
+                'course_ids': data['course_ids'],
+                'room_ids': data['room_ids'],
+                'time_slot_ids': data['time_slot_ids'],
+            })
+        if data.get('search_time_budget'):
+            options['search'] = {'time_budget': data['search_time_budget']}
+        
+        log = enqueue_generation(request.user, data['semester'], data['academic_year'], options)
+        return Response({
+            'message': 'Timetable generation queued.',
+            'job_id': log.id,
+            'log': ScheduleGenerationLogSerializer(log).data
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['post'], url_path='dry-run', permission_classes=[permissions.IsAdminUser])
+    def dry_run(self, request):
+        """
+        Preview generation with added, removed or resized rooms and time
+        slots (admin only).
+        
+        Runs the solver in memory on one snapshot for every scenario and
+        never writes to the database.
+        """
+        serializer = DryRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        search_options = None
+        if data.get('search_time_budget'):
+            search_options = {'time_budget': data['search_time_budget']}
         
-        try:
-            result = generate_timetable(semester, academic_year, request.user)
-            
-            log = ScheduleGenerationLog.objects.create(
-                generated_by=request.user,
-                status=result['status'],
-                courses_scheduled=result['courses_scheduled'],
-                conflicts_found=result['conflicts_found'],
-                conflicts_resolved=result['conflicts_resolved'],
-                error_message=result.get('error_message', '')
-            )
-            
-            serializer = ScheduleGenerationLogSerializer(log)
-            return Response({
-                'message': 'Timetable generation completed.',
-                'log': serializer.data,
-                'timetable': result.get('timetable', [])
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
-            log = ScheduleGenerationLog.objects.create(
-                generated_by=request.user,
-                status='failed',
-                courses_scheduled=0,
-                conflicts_found=0,
-                conflicts_resolved=0,
-                error_message=str(e)
-            )
-            return Response({
-                'error': 'Timetable generation failed.',
-                'log': ScheduleGenerationLogSerializer(log).data
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        snapshot = ScheduleSnapshot.load()
+        results = []
+        for scenario in data.get('scenarios') or [data]:
+            changes = {
+                field: scenario[field] for field in (
+                    'add_rooms', 'remove_room_ids', 'room_capacities', 'add_time_slots', 'remove_time_slot_ids'
+                ) if field in scenario
+            }
+            preview = preview_timetable(snapshot, search_options=search_options, **changes)
+            preview['label'] = scenario.get('label', '')
+            results.append(preview)
+        
+        return Response({'scenarios': results})
+
+
+class TimetableVersionViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for timetable versions (admin only)."""
+    serializer_class = TimetableVersionSerializer
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get_queryset(self):
+        queryset = TimetableVersion.objects.annotate(
+            entry_count=Count('entries'),
+            is_published=Exists(PublishedTimetable.objects.filter(version=OuterRef('pk')))
+        ).select_related('created_by').order_by('-created_at', '-id')
+        semester = self.request.query_params.get('semester')
+        academic_year = self.request.query_params.get('academic_year')
+        if semester:
+            queryset = queryset.filter(semester=semester)
+        if academic_year:
+            queryset = queryset.filter(academic_year=academic_year)
+        return queryset
+    
+    @action(detail=True, methods=['post'])
+    def publish(self, request, pk=None):
+        """Publish this version, switching readers over at once. Also used to roll back."""
+        version = publish_version(self.get_object(), request.user)
+        return Response(self.get_serializer(self.get_queryset().get(pk=version.pk)).data)
 
 
 class ScheduleGenerationLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -95,4 +216,14 @@ class ScheduleGenerationLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ScheduleGenerationLogSerializer
     permission_classes = [permissions.IsAdminUser]
     queryset = ScheduleGenerationLog.objects.all()
+    
+    @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        """Lightweight job status for polling, without the stored result."""
+        job = self.get_queryset().filter(pk=pk).values(
+            'id', 'status', 'progress', 'phase', 'phase_timings', 'started_at', 'finished_at'
+        ).first()
+        if job is None:
+            return Response({'error': 'Job not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
 
@@ -24,10 +24,17 @@ const Timetable = () => {
 
   const handleGenerate = async () => {
     try {
-      await api.post('/timetable/generate/', {
+      const response = await api.post('/timetable/generate/', {
         semester: 1,
         academic_year: '2024-2025',
       });
+      // Generation runs as a background job; poll it until it finishes.
+      const jobId = response.data.job_id;
+      let job = response.data.log;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = (await api.get(`/timetable/generation-logs/${jobId}/progress/`)).data;
+      }
       fetchTimetable();
     } catch (error) {
       console.error('Error generating timetable:', error);